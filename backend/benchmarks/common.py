@@ -0,0 +1,7 @@
+"""Helpers shared by the benchmark scripts."""
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile (pct in 0..1) of a non-empty list."""
+    values = sorted(values)
+    return values[min(int(len(values) * pct), len(values) - 1)]
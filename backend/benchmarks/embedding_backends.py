@@ -0,0 +1,111 @@
+"""Latency benchmark and parity check for the embedding backends.
+
+Compares eager PyTorch (HuggingFaceEmbedding) with the ONNX Runtime
+backend, optionally int8 quantized:
+
+    cd backend
+    python -m benchmarks.embedding_backends --threads 4 --quantize
+
+Reports per-query latency (one query at a time, as search does) and bulk
+throughput (batched documents, as indexing does), plus cosine parity of
+each ONNX variant against the PyTorch vectors.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import percentile
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from rag.embeddings import OnnxEmbedding, check_onnx_parity, get_embedding_model_name, get_onnx_cache_dir
+
+WORDS = (
+    "knowledge retrieval embedding vector index document search query model "
+    "latency throughput batch research notes summary citation source chunk"
+).split()
+
+
+def synthetic_texts(count: int, words: int, offset: int = 0) -> list:
+    """Deterministic pseudo-sentences of a given length."""
+    return [
+        " ".join(WORDS[(i * 7 + j * 3 + offset) % len(WORDS)] for j in range(words))
+        for i in range(count)
+    ]
+
+
+def benchmark(embed_model, queries: list, documents: list, warmup: int = 3) -> dict:
+    for query in queries[:warmup]:
+        embed_model.get_query_embedding(query)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embed_model.get_query_embedding(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    embed_model.get_text_embedding_batch(documents)
+    bulk_seconds = time.perf_counter() - start
+
+    return {
+        "query_ms_p50": round(percentile(latencies, 0.50), 2),
+        "query_ms_p95": round(percentile(latencies, 0.95), 2),
+        "query_ms_mean": round(statistics.mean(latencies), 2),
+        "bulk_seconds": round(bulk_seconds, 3),
+        "bulk_docs_per_second": round(len(documents) / bulk_seconds, 1),
+    }
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=get_embedding_model_name())
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--documents", type=int, default=512)
+    parser.add_argument("--doc-words", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=int(os.getenv("EMBEDDING_THREADS", "0")))
+    parser.add_argument("--quantize", action="store_true", help="Also benchmark the int8 ONNX export")
+    parser.add_argument("--output", help="Write JSON results here as well as stdout")
+    args = parser.parse_args()
+
+    queries = synthetic_texts(args.queries, 8)
+    documents = synthetic_texts(args.documents, args.doc_words, offset=1)
+
+    backends = {"torch": lambda: HuggingFaceEmbedding(model_name=args.model, device="cpu")}
+    variants = [False, True] if args.quantize else [False]
+    for quantize in variants:
+        backends["onnx-int8" if quantize else "onnx"] = lambda q=quantize: OnnxEmbedding(
+            model_name=args.model, cache_dir=get_onnx_cache_dir(), quantize=q, threads=args.threads
+        )
+
+    results = {}
+    for name, factory in backends.items():
+        results[name] = benchmark(factory(), queries, documents)
+        if name != "torch":
+            results[name]["parity"] = check_onnx_parity(args.model, quantize=name == "onnx-int8")
+
+    report = {
+        "model": args.model,
+        "threads": args.threads,
+        "queries": args.queries,
+        "documents": args.documents,
+        "doc_words": args.doc_words,
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output)
+
+
+if __name__ == "__main__":
+    main()
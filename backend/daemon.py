@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Shared retrieval daemon for multi-client setups.
+
+Loads the embedding model, KeyBERT and spaCy once and serves the MCP tools
+over HTTP on a Unix socket, so every Claude session's MCP server can be a
+thin front-end (SERVE_MODE=daemon) instead of a full copy:
+
+    cd backend
+    python daemon.py
+
+Front-ends start the daemon themselves when DAEMON_AUTOSTART=true and the
+socket is not answering. A lock file next to the socket keeps a second
+daemon from taking over a running one.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def get_socket_path() -> str:
+    """DAEMON_SOCKET, default STORAGE_DIR/knowledge.sock."""
+    default = Path(os.getenv("STORAGE_DIR", "../data/storage")) / "knowledge.sock"
+    return str(Path(os.getenv("DAEMON_SOCKET", str(default))).resolve())
+
+
+class DaemonClient:
+    """Thin async client used by MCP front-ends in SERVE_MODE=daemon."""
+
+    def __init__(self, socket_path: str, autostart: bool = True, start_timeout: float = 180.0, request_timeout: float = 600.0):
+        self.socket_path = socket_path
+        self.autostart = autostart
+        self.start_timeout = start_timeout
+        self.request_timeout = request_timeout
+        self._session = None
+        # One reconnect at a time, however many calls fail together
+        self._reconnect: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "DaemonClient":
+        return cls(
+            socket_path=get_socket_path(),
+            autostart=os.getenv("DAEMON_AUTOSTART", "true").lower() == "true",
+            start_timeout=float(os.getenv("DAEMON_START_TIMEOUT", "180")),
+            request_timeout=float(os.getenv("DAEMON_REQUEST_TIMEOUT", "600"))
+        )
+
+    def _get_session(self):
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=self.socket_path),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+        return self._session
+
+    async def healthy(self) -> bool:
+        if not os.path.exists(self.socket_path):
+            return False
+        try:
+            async with self._get_session().get("http://daemon/health") as resp:
+                return resp.status == 200
+        except Exception:
+            return False
+
+    def _spawn(self):
+        """Start a detached daemon that logs to a file next to the socket."""
+        log_path = Path(self.socket_path).with_suffix(".log")
+        with open(log_path, "ab") as log:
+            subprocess.Popen(
+                [sys.executable, str(Path(__file__).resolve())],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                start_new_session=True
+            )
+        print(f"Started retrieval daemon (log: {log_path})", file=sys.stderr)
+
+    async def connect(self) -> bool:
+        """Make sure a daemon is answering, starting one if allowed.
+
+        Returns:
+            True once the daemon responds to /health
+        """
+        if await self.healthy():
+            return True
+        if not self.autostart:
+            return False
+
+        self._spawn()
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+            if await self.healthy():
+                return True
+        return False
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]]) -> str:
+        """Run a tool in the daemon and return its text response.
+
+        A relative file_path is resolved here first: the daemon runs in
+        its own working directory, not the front-end's.
+        """
+        arguments = dict(arguments or {})
+        if arguments.get("file_path"):
+            arguments["file_path"] = str(Path(arguments["file_path"]).expanduser().resolve())
+
+        try:
+            async with self._get_session().post(
+                f"http://daemon/tools/{name}", json=arguments
+            ) as resp:
+                data = await resp.json()
+                return data["text"]
+        except Exception as e:
+            # Daemon restarted or died: try to bring it back for the next call
+            if self.autostart and (self._reconnect is None or self._reconnect.done()):
+                self._reconnect = asyncio.ensure_future(self.connect())
+            return json.dumps({"error": f"Retrieval daemon unavailable: {e}"})
+
+    async def close(self):
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+        if self._session is not None:
+            await self._session.close()
+
+
+def create_app():
+    """FastAPI app exposing the shared tool service."""
+    from fastapi import Body, FastAPI
+
+    import service
+    from tool_definitions import TOOLS
+
+    app = FastAPI(title="personal-knowledge daemon")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "pid": os.getpid(), "initialized": service.indexer is not None}
+
+    @app.get("/tools")
+    async def list_tools():
+        return TOOLS
+
+    @app.post("/tools/{name}")
+    async def call_tool(name: str, arguments: Dict[str, Any] = Body(default={})):
+        return {"text": await service.call_tool(name, arguments)}
+
+    return app
+
+
+def acquire_lock(socket_path: str):
+    """Exclusive lock for this socket; None if another daemon holds it."""
+    lock_file = open(socket_path + ".lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def bind_socket(socket_path: str) -> socket.socket:
+    """Bind the Unix socket with mode 0600 so only the daemon's user can call tools.
+
+    Tools can copy any readable file into the knowledge base and download
+    models, so the socket must not be world-accessible (uvicorn's own uds
+    binding chmods it to 0666).
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # stale: we hold the lock
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        sock.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    os.chmod(socket_path, 0o600)
+    sock.listen(128)
+    return sock
+
+
+def main():
+    socket_path = get_socket_path()
+    Path(socket_path).parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    # Before the heavy imports, so extra spawned daemons exit right away
+    lock = acquire_lock(socket_path)
+    if lock is None:
+        print(f"Daemon already running on {socket_path}", file=sys.stderr)
+        return
+
+    import uvicorn
+    import service
+
+    print("Initializing retrieval daemon...", file=sys.stderr)
+    service.startup()
+
+    # Bind only after the models are loaded: /health answering means ready
+    print(f"Retrieval daemon ready on {socket_path}", file=sys.stderr)
+    sock = bind_socket(socket_path)
+    try:
+        uvicorn.run(create_app(), fd=sock.fileno(), log_level="warning")
+    finally:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        lock.close()
+
+
+if __name__ == "__main__":
+    main()
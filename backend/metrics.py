@@ -0,0 +1,264 @@
+"""In-process metrics and optional tracing for MCP tools and their sub-stages.
+
+Tool calls and internal stages (query embedding, DB search, provider HTTP,
+KeyBERT, ...) are recorded as call/error counts plus latency histograms.
+Data is served by the get_server_metrics tool, optionally as Prometheus
+text on METRICS_PORT, and exported as OpenTelemetry spans over OTLP when
+OTEL_ENABLED=true and opentelemetry-sdk plus an OTLP exporter are
+installed. With METRICS_ENABLED=false every hook is a shared no-op context
+manager.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf"))
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value_ms: float):
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if value_ms <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.sum += value_ms
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Bucket upper bound containing the given percentile."""
+        if not self.count:
+            return None
+        target = pct * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound if bound != float("inf") else None
+        return None
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count, 2) if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+        }
+
+
+def _setup_tracer_provider(trace):
+    """Install an SDK tracer provider exporting over OTLP, unless one is set.
+
+    Under opentelemetry-instrument a provider already exists and is kept.
+    Otherwise spans go to the OTLP exporter configured by the standard
+    OTEL_EXPORTER_OTLP_* variables (gRPC exporter, or HTTP if only that
+    one is installed).
+    """
+    if not isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider):
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        print("Warning: OTEL_ENABLED set but opentelemetry-sdk is not installed, spans are dropped", file=sys.stderr)
+        return
+
+    try:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("Warning: OTEL_ENABLED set but no OTLP exporter is installed, spans are dropped", file=sys.stderr)
+            return
+
+    resource = Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "personal-knowledge")})
+    provider = TracerProvider(resource=resource)
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+class MetricsRegistry:
+    """Thread-safe registry of tool and stage metrics."""
+
+    def __init__(self, enabled: bool = True, tracing: bool = False):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict] = {}
+        self._stages: Dict[str, Dict] = {}
+        # Objects with a stats() dict, e.g. rag.batching micro-batchers
+        self._batchers: Dict[str, object] = {}
+        self._tracer = None
+
+        if enabled and tracing:
+            try:
+                from opentelemetry import trace
+                _setup_tracer_provider(trace)
+                self._tracer = trace.get_tracer("personal-knowledge")
+            except ImportError:
+                print("Warning: OTEL_ENABLED set but opentelemetry is not installed", file=sys.stderr)
+
+    def _record(self, table: Dict, name: str, elapsed_ms: float, error: bool):
+        with self._lock:
+            entry = table.get(name)
+            if entry is None:
+                entry = table[name] = {"calls": 0, "errors": 0, "latency": Histogram()}
+            entry["calls"] += 1
+            entry["errors"] += int(error)
+            entry["latency"].observe(elapsed_ms)
+
+    def record_tool(self, name: str, elapsed_ms: float, error: bool = False):
+        if self.enabled:
+            self._record(self._tools, name, elapsed_ms, error)
+
+    def record_stage(self, name: str, elapsed_ms: float, error: bool = False):
+        if self.enabled:
+            self._record(self._stages, name, elapsed_ms, error)
+
+    def register_batcher(self, name: str, batcher):
+        """Report a micro-batcher's stats; None unregisters the name."""
+        with self._lock:
+            if batcher is None:
+                self._batchers.pop(name, None)
+            else:
+                self._batchers[name] = batcher
+
+    def stage(self, name: str):
+        """Context manager timing one stage; exceptions count as errors."""
+        if not self.enabled:
+            return _NOOP
+        return self._timed(name, self.record_stage)
+
+    def tool(self, name: str):
+        """Context manager timing a tool call; exceptions count as errors."""
+        if not self.enabled:
+            return _NOOP
+        return self._timed(name, self.record_tool)
+
+    @contextmanager
+    def _timed(self, name: str, record):
+        span = self._tracer.start_as_current_span(name) if self._tracer is not None else _NOOP
+        start = time.perf_counter()
+        error = False
+        with span:
+            try:
+                yield
+            except BaseException:
+                error = True
+                raise
+            finally:
+                record(name, (time.perf_counter() - start) * 1000, error)
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly view of all metrics."""
+        def view(table):
+            return {
+                name: {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "error_rate": round(entry["errors"] / entry["calls"], 4) if entry["calls"] else 0.0,
+                    "latency": entry["latency"].summary(),
+                }
+                for name, entry in sorted(table.items())
+            }
+
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "tools": view(self._tools),
+                "stages": view(self._stages),
+                "batching": {name: batcher.stats() for name, batcher in sorted(self._batchers.items())},
+            }
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+
+        def emit(metric, label, table):
+            lines.append(f"# TYPE {metric}_calls_total counter")
+            lines.append(f"# TYPE {metric}_errors_total counter")
+            lines.append(f"# TYPE {metric}_latency_ms histogram")
+            for name, entry in sorted(table.items()):
+                labels = f'{label}="{name}"'
+                lines.append(f"{metric}_calls_total{{{labels}}} {entry['calls']}")
+                lines.append(f"{metric}_errors_total{{{labels}}} {entry['errors']}")
+                cumulative = 0
+                histogram = entry["latency"]
+                for bound, count in zip(LATENCY_BUCKETS_MS, histogram.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'{metric}_latency_ms_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{metric}_latency_ms_sum{{{labels}}} {histogram.sum:.3f}")
+                lines.append(f"{metric}_latency_ms_count{{{labels}}} {histogram.count}")
+
+        with self._lock:
+            emit("mcp_tool", "tool", self._tools)
+            emit("mcp_stage", "stage", self._stages)
+            batching = {name: batcher.stats() for name, batcher in sorted(self._batchers.items())}
+
+        if batching:
+            lines.append("# TYPE mcp_batch_requests_total counter")
+            lines.append("# TYPE mcp_batches_total counter")
+            lines.append("# TYPE mcp_batch_mean_size gauge")
+            lines.append("# TYPE mcp_batch_mean_queue_wait_ms gauge")
+            for name, stats in batching.items():
+                labels = f'batcher="{name}"'
+                lines.append(f"mcp_batch_requests_total{{{labels}}} {stats['requests']}")
+                lines.append(f"mcp_batches_total{{{labels}}} {stats['batches']}")
+                lines.append(f"mcp_batch_mean_size{{{labels}}} {stats['mean_batch_size'] or 0}")
+                lines.append(f"mcp_batch_mean_queue_wait_ms{{{labels}}} {stats['mean_queue_wait_ms'] or 0}")
+
+        return "\n".join(lines) + "\n"
+
+
+def start_prometheus_server(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics in Prometheus text format from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep stdout/stderr clean for the MCP stdio transport
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+metrics = MetricsRegistry(
+    enabled=os.getenv("METRICS_ENABLED", "true").lower() == "true",
+    tracing=os.getenv("OTEL_ENABLED", "false").lower() == "true"
+)
+
+
+def stage(name: str):
+    """Time a sub-stage on the process-wide registry."""
+    return metrics.stage(name)
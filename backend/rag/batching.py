@@ -0,0 +1,192 @@
+"""Cross-request micro-batching for model forward passes."""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+
+def micro_batching_enabled() -> bool:
+    """MICRO_BATCHING=false turns batching off (every call runs on its own)."""
+    return os.getenv("MICRO_BATCHING", "true").lower() == "true"
+
+
+def micro_batch_settings() -> Dict:
+    """window_ms / max_batch from MICRO_BATCH_WINDOW_MS / MICRO_BATCH_MAX."""
+    return {
+        "window_ms": float(os.getenv("MICRO_BATCH_WINDOW_MS", "2")),
+        "max_batch": int(os.getenv("MICRO_BATCH_MAX", "32"))
+    }
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one batched call.
+
+    Callers block in `submit` while a worker thread collects requests for up
+    to `window_ms` after the first one arrives (or until `max_batch` are
+    queued), runs `batch_fn` once and hands each caller its result. With
+    window_ms=0 it batches greedily: whatever queued up during the previous
+    forward pass goes into the next one, with no added wait.
+    """
+
+    def __init__(self, batch_fn: Callable[[List], List], window_ms: float = 2.0, max_batch: int = 32, name: str = "batcher"):
+        self.batch_fn = batch_fn
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.name = name
+
+        self._queue = queue.Queue()
+        # Guards _closed so no item is queued behind the stop sentinel
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "max_batch": 0, "wait_ms": 0.0, "run_ms": 0.0, "errors": 0}
+        self._sizes: Dict[int, int] = {}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, batch_fn: Callable[[List], List], name: str) -> Optional["MicroBatcher"]:
+        """Batcher with MICRO_BATCH_WINDOW_MS / MICRO_BATCH_MAX, or None if MICRO_BATCHING=false."""
+        if not micro_batching_enabled():
+            return None
+        return cls(batch_fn, name=name, **micro_batch_settings())
+
+    def submit(self, item):
+        """Run `item` as part of the next batch and return its result.
+
+        After close() (e.g. a search still holding a retriever from before
+        a model cutover) the item runs on its own in the calling thread.
+        """
+        future = Future()
+        with self._close_lock:
+            closed = self._closed
+            if not closed:
+                self._queue.put((item, future, time.perf_counter()))
+        if closed:
+            return self.batch_fn([item])[0]
+        return future.result()
+
+    def close(self):
+        """Stop the worker after the queued requests are served."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+
+    def _fail_remaining(self):
+        """Fail anything left behind the stop sentinel, so no caller blocks forever."""
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not None:
+                entry[1].set_exception(RuntimeError(f"{self.name} batcher is closed"))
+
+    def _collect(self, first) -> List:
+        batch = [first]
+        deadline = time.perf_counter() + self.window_ms / 1000
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._fail_remaining()
+                return
+
+            batch = self._collect(first)
+            started = time.perf_counter()
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+                error = False
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                error = True
+
+            finished = time.perf_counter()
+            with self._stats_lock:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["errors"] += int(error)
+                self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+                self._stats["wait_ms"] += sum((started - queued) * 1000 for _, _, queued in batch)
+                self._stats["run_ms"] += (finished - started) * 1000
+                self._sizes[len(batch)] = self._sizes.get(len(batch), 0) + 1
+
+    def stats(self) -> Dict:
+        """Batch size and latency counters since start."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            sizes = dict(sorted(self._sizes.items()))
+
+        requests, batches = stats["requests"], stats["batches"]
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch,
+            "requests": requests,
+            "batches": batches,
+            "errors": stats["errors"],
+            "mean_batch_size": round(requests / batches, 2) if batches else None,
+            "largest_batch": stats["max_batch"],
+            "mean_queue_wait_ms": round(stats["wait_ms"] / requests, 3) if requests else None,
+            "mean_batch_run_ms": round(stats["run_ms"] / batches, 3) if batches else None,
+            "batch_sizes": {str(size): count for size, count in sizes.items()},
+        }
+
+
+def batch_query_embeddings(embed_model, queries: List[str]) -> List[List[float]]:
+    """One forward pass for many queries, with the model's query prompt.
+
+    Models from rag.embeddings provide get_query_embedding_batch; any other
+    embedding model is called once per query.
+    """
+    if hasattr(embed_model, "get_query_embedding_batch"):
+        return embed_model.get_query_embedding_batch(queries)
+    return [embed_model.get_query_embedding(query) for query in queries]
+
+
+class BatchedQueryEmbedder:
+    """Drop-in `get_query_embedding` for KnowledgeRetriever that batches across requests."""
+
+    def __init__(self, embed_model, window_ms: float = 2.0, max_batch: int = 32):
+        self.embed_model = embed_model
+        self.batcher = MicroBatcher(self._embed_unique, window_ms=window_ms, max_batch=max_batch, name="query_embeddings")
+
+    @classmethod
+    def from_env(cls, embed_model) -> Optional["BatchedQueryEmbedder"]:
+        """Wrap embed_model unless MICRO_BATCHING=false."""
+        if not micro_batching_enabled():
+            return None
+        return cls(embed_model, **micro_batch_settings())
+
+    def _embed_unique(self, queries: List[str]) -> List[List[float]]:
+        # The same query from several clients is embedded once
+        unique = list(dict.fromkeys(queries))
+        embeddings = dict(zip(unique, batch_query_embeddings(self.embed_model, unique)))
+        return [embeddings[query] for query in queries]
+
+    def get_query_embedding(self, query: str) -> List[float]:
+        return self.batcher.submit(query)
+
+    def stats(self) -> Dict:
+        return self.batcher.stats()
+
+    def close(self):
+        self.batcher.close()
@@ -0,0 +1,323 @@
+"""Catalog of indexed documents with per-document stats."""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Index, Integer, MetaData, String, Table, Text,
+    bindparam, create_engine, delete, func, inspect, select, text, update
+)
+
+metadata = MetaData()
+
+documents_table = Table(
+    "knowledge_documents",
+    metadata,
+    Column("embedding_model", String(255), primary_key=True),
+    Column("file_path", Text, primary_key=True),
+    Column("file_name", Text, nullable=False),
+    Column("file_type", String(16), nullable=False),
+    Column("chunk_count", Integer, nullable=False, default=0),
+    Column("bytes", BigInteger, nullable=False, default=0),
+    Column("content_hash", String(64), nullable=False),
+    Column("indexed_at", DateTime(timezone=True), nullable=False),
+    # File mtime when it was last hashed; the watcher skips hashing files whose mtime and size match
+    Column("mtime_ns", BigInteger),
+    Index("ix_knowledge_documents_name", "embedding_model", "file_name"),
+    Index("ix_knowledge_documents_type", "embedding_model", "file_type"),
+    Index("ix_knowledge_documents_indexed_at", "embedding_model", "indexed_at"),
+)
+
+models_table = Table(
+    "knowledge_models",
+    metadata,
+    Column("model_name", String(255), primary_key=True),
+    Column("table_name", String(63), nullable=False),
+    Column("dimension", Integer, nullable=False),
+    # active: serving search; building: shadow index in progress;
+    # ready: fully indexed but not serving; failed: shadow build failed
+    Column("status", String(16), nullable=False),
+    Column("error", Text),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("activated_at", DateTime(timezone=True)),
+)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive values are taken as UTC.
+
+    Timestamps are stored in UTC, and SQLite hands them back naive.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class DocumentCatalog:
+    """Track what is indexed, maintained by DocumentIndexer.
+
+    Rows are keyed by (embedding_model, file_path) and listed with keyset
+    pagination on the primary key, so a page costs O(page size) regardless
+    of how many documents are indexed.
+    """
+
+    def __init__(self, db_url: str, embedding_model: str):
+        self.engine = create_engine(db_url)
+        self.embedding_model = embedding_model
+        metadata.create_all(self.engine)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        """Columns added after the table was first created (create_all skips existing tables)."""
+        columns = {column["name"] for column in inspect(self.engine).get_columns(documents_table.name)}
+        if "mtime_ns" not in columns:
+            with self.engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {documents_table.name} ADD COLUMN mtime_ns BIGINT"))
+
+    def _insert(self):
+        """Dialect-specific INSERT supporting ON CONFLICT."""
+        if self.engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(documents_table)
+
+    def upsert(self, entries: List[Dict]):
+        """Insert or update catalog rows.
+
+        Args:
+            entries: dicts with file_path, chunk_count, bytes, content_hash
+                and mtime_ns
+        """
+        if not entries:
+            return
+
+        now = datetime.now(timezone.utc)
+        rows = []
+        for entry in entries:
+            file_path = entry["file_path"]
+            file_name = file_path.replace("\\", "/").rsplit("/", 1)[-1]
+            rows.append({
+                "embedding_model": self.embedding_model,
+                "file_path": file_path,
+                "file_name": file_name,
+                "file_type": file_name.rsplit(".", 1)[-1].lower() if "." in file_name else "",
+                "chunk_count": entry.get("chunk_count", 0),
+                "bytes": entry.get("bytes", 0),
+                "content_hash": entry["content_hash"],
+                "indexed_at": now,
+                "mtime_ns": entry.get("mtime_ns"),
+            })
+
+        stmt = self._insert().values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["embedding_model", "file_path"],
+            set_={
+                col: stmt.excluded[col]
+                for col in ("file_name", "file_type", "chunk_count", "bytes", "content_hash", "indexed_at", "mtime_ns")
+            }
+        )
+
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def remove(self, file_paths: Iterable[str]):
+        """Delete catalog rows for the given paths."""
+        file_paths = list(file_paths)
+        if not file_paths:
+            return
+
+        with self.engine.begin() as conn:
+            conn.execute(
+                delete(documents_table).where(
+                    documents_table.c.embedding_model == self.embedding_model,
+                    documents_table.c.file_path.in_(file_paths)
+                )
+            )
+
+    def get_hashes(self, file_paths: Iterable[str]) -> Dict[str, str]:
+        """Map already-indexed paths to their content hash."""
+        file_paths = list(file_paths)
+        if not file_paths:
+            return {}
+
+        query = select(documents_table.c.file_path, documents_table.c.content_hash).where(
+            documents_table.c.embedding_model == self.embedding_model,
+            documents_table.c.file_path.in_(file_paths)
+        )
+
+        with self.engine.connect() as conn:
+            return {row.file_path: row.content_hash for row in conn.execute(query)}
+
+    def touch(self, entries: List[Dict]):
+        """Record the current mtime/size of files found unchanged by content hash.
+
+        Args:
+            entries: dicts with file_path, bytes and mtime_ns
+        """
+        if not entries:
+            return
+
+        t = documents_table
+        stmt = update(t).where(
+            t.c.embedding_model == self.embedding_model,
+            t.c.file_path == bindparam("path")
+        ).values(bytes=bindparam("size"), mtime_ns=bindparam("mtime"))
+
+        with self.engine.begin() as conn:
+            conn.execute(stmt, [
+                {"path": entry["file_path"], "size": entry["bytes"], "mtime": entry["mtime_ns"]}
+                for entry in entries
+            ])
+
+    def file_stats(self) -> Dict[str, Tuple[Optional[int], int]]:
+        """Map every indexed path to the (mtime_ns, bytes) it had when last hashed."""
+        t = documents_table
+        query = select(t.c.file_path, t.c.mtime_ns, t.c.bytes).where(t.c.embedding_model == self.embedding_model)
+
+        with self.engine.connect() as conn:
+            return {row.file_path: (row.mtime_ns, row.bytes) for row in conn.execute(query)}
+
+    def count(self) -> int:
+        """Number of indexed documents for the current model."""
+        query = select(func.count()).select_from(documents_table).where(
+            documents_table.c.embedding_model == self.embedding_model
+        )
+
+        with self.engine.connect() as conn:
+            return conn.execute(query).scalar()
+
+    def all_paths(self) -> List[str]:
+        """All indexed paths for the current model (used by full reindex)."""
+        query = select(documents_table.c.file_path).where(
+            documents_table.c.embedding_model == self.embedding_model
+        )
+
+        with self.engine.connect() as conn:
+            return [row.file_path for row in conn.execute(query)]
+
+    def list(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        file_type: Optional[str] = None,
+        name_contains: Optional[str] = None,
+        indexed_after: Optional[datetime] = None
+    ) -> Dict:
+        """List one page of indexed documents.
+
+        Args:
+            limit: Page size
+            cursor: next_cursor from the previous page
+            file_type: Only this extension (e.g. "pdf")
+            name_contains: Case-insensitive file name filter
+            indexed_after: Only documents indexed after this time (naive
+                datetimes are taken as UTC)
+
+        Returns:
+            Dict with documents, count and next_cursor (None on last page)
+        """
+        t = documents_table
+        query = select(t).where(t.c.embedding_model == self.embedding_model)
+
+        if cursor:
+            query = query.where(t.c.file_path > cursor)
+        if file_type:
+            query = query.where(t.c.file_type == file_type.lower().lstrip("."))
+        if name_contains:
+            query = query.where(t.c.file_name.icontains(name_contains, autoescape=True))
+        if indexed_after:
+            query = query.where(t.c.indexed_at > as_utc(indexed_after))
+
+        query = query.order_by(t.c.file_path).limit(limit + 1)
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).mappings().all()
+
+        page = rows[:limit]
+        documents = [
+            {
+                "file_name": row["file_name"],
+                "file_path": row["file_path"],
+                "file_type": row["file_type"],
+                "chunk_count": row["chunk_count"],
+                "bytes": row["bytes"],
+                "content_hash": row["content_hash"],
+                "indexed_at": as_utc(row["indexed_at"]).isoformat(),
+                "embedding_model": row["embedding_model"],
+            }
+            for row in page
+        ]
+
+        return {
+            "documents": documents,
+            "count": len(documents),
+            "next_cursor": page[-1]["file_path"] if len(rows) > limit else None
+        }
+
+
+class ModelRegistry:
+    """Embedding models with an index, and which one serves search."""
+
+    def __init__(self, db_url: str):
+        self.engine = create_engine(db_url)
+        metadata.create_all(self.engine)
+
+    def register(self, model_name: str, table_name: str, dimension: int, status: str = "ready"):
+        """Record a model (no-op if already registered)."""
+        with self.engine.begin() as conn:
+            exists = conn.execute(
+                select(models_table.c.model_name).where(models_table.c.model_name == model_name)
+            ).first()
+            if exists is None:
+                conn.execute(models_table.insert().values(
+                    model_name=model_name,
+                    table_name=table_name,
+                    dimension=dimension,
+                    status=status,
+                    created_at=datetime.now(timezone.utc)
+                ))
+
+    def set_status(self, model_name: str, status: str, error: Optional[str] = None):
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(models_table)
+                .where(models_table.c.model_name == model_name)
+                .values(status=status, error=error)
+            )
+
+    def activate(self, model_name: str):
+        """Make a model the one serving search (previous one becomes ready)."""
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(models_table)
+                .where(models_table.c.status == "active")
+                .values(status="ready")
+            )
+            conn.execute(
+                update(models_table)
+                .where(models_table.c.model_name == model_name)
+                .values(status="active", error=None, activated_at=datetime.now(timezone.utc))
+            )
+
+    def get_active(self) -> Optional[str]:
+        """Name of the active model, if any."""
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(models_table.c.model_name).where(models_table.c.status == "active")
+            ).scalar()
+
+    def list(self) -> List[Dict]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(models_table).order_by(models_table.c.created_at)).mappings().all()
+
+        return [
+            {
+                "model_name": row["model_name"],
+                "table_name": row["table_name"],
+                "dimension": row["dimension"],
+                "status": row["status"],
+                "error": row["error"],
+                "created_at": row["created_at"].isoformat(),
+                "activated_at": row["activated_at"].isoformat() if row["activated_at"] else None,
+            }
+            for row in rows
+        ]
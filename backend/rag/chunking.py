@@ -0,0 +1,384 @@
+"""Configurable chunking and near-duplicate chunk detection."""
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.node_parser import MarkdownNodeParser, SentenceSplitter, TokenTextSplitter
+from llama_index.core.schema import BaseNode, Document
+
+from rag.persistence import DeferredSave, persist_interval
+
+# Per file type defaults; sizes are in embedding-model tokens. File types
+# only override what they set, the rest comes from "default".
+DEFAULT_CHUNKING = {
+    "default": {"strategy": "sentence", "chunk_size": 480, "chunk_overlap": 60},
+    ".md": {"strategy": "markdown"},
+}
+
+STRATEGIES = ("sentence", "token", "markdown")
+
+
+def _model_tokenizer(embed_model=None):
+    """Tokenizer of the local embedding model, so chunk sizes match what it embeds."""
+    embed_model = embed_model or Settings.embed_model
+    # HuggingFaceEmbedding wraps a SentenceTransformer; OnnxEmbedding exposes its tokenizer
+    tokenizer = getattr(getattr(embed_model, "_model", None), "tokenizer", None)
+    tokenizer = tokenizer or getattr(embed_model, "tokenizer", None)
+    return tokenizer.tokenize if tokenizer is not None else None
+
+
+class Chunker:
+    """Split documents into chunks with per file type settings.
+
+    Config maps a file extension (or "default") to a dict with:
+        strategy: "sentence" (sentence-aware), "token" (fixed token windows)
+            or "markdown" (split on headings, then sentence-aware)
+        chunk_size: Maximum tokens per chunk
+        chunk_overlap: Tokens shared between consecutive chunks
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Dict]] = None,
+        strip_boilerplate: bool = True,
+        embed_model=None
+    ):
+        self.config = {key: dict(value) for key, value in DEFAULT_CHUNKING.items()}
+        for key, value in (config or {}).items():
+            self.config.setdefault(key.lower(), {}).update(value)
+
+        for key in self.config:
+            strategy = self.settings_for(key)["strategy"]
+            if strategy not in STRATEGIES:
+                raise ValueError(f"Unknown chunking strategy for {key}: {strategy}")
+
+        self.strip_boilerplate = strip_boilerplate
+        self.embed_model = embed_model
+        self._parsers = {}
+
+    @classmethod
+    def from_env(cls, embed_model=None) -> "Chunker":
+        """Build a chunker from CHUNK_* environment variables.
+
+        CHUNK_SIZE / CHUNK_OVERLAP change the default for every file type,
+        CHUNKING_CONFIG (JSON) overrides individual types, e.g.
+        {".pdf": {"strategy": "token", "chunk_size": 256}}.
+        """
+        config = json.loads(os.getenv("CHUNKING_CONFIG", "{}"))
+        default = config.setdefault("default", {})
+
+        if os.getenv("CHUNK_SIZE"):
+            default["chunk_size"] = int(os.getenv("CHUNK_SIZE"))
+        if os.getenv("CHUNK_OVERLAP"):
+            default["chunk_overlap"] = int(os.getenv("CHUNK_OVERLAP"))
+
+        strip = os.getenv("CHUNK_STRIP_BOILERPLATE", "true").lower() == "true"
+        return cls(config, strip_boilerplate=strip, embed_model=embed_model)
+
+    def settings_for(self, extension: str) -> Dict:
+        """Chunking settings used for a file extension."""
+        return {**self.config["default"], **self.config.get(extension.lower(), {})}
+
+    def _parser(self, extension: str):
+        settings = self.settings_for(extension)
+        key = (settings["strategy"], settings["chunk_size"], settings["chunk_overlap"])
+
+        if key not in self._parsers:
+            strategy, chunk_size, chunk_overlap = key
+            tokenizer = _model_tokenizer(self.embed_model)
+
+            if strategy == "token":
+                splitter = TokenTextSplitter(
+                    chunk_size=chunk_size, chunk_overlap=chunk_overlap, tokenizer=tokenizer
+                )
+            else:
+                splitter = SentenceSplitter(
+                    chunk_size=chunk_size, chunk_overlap=chunk_overlap, tokenizer=tokenizer
+                )
+
+            self._parsers[key] = [MarkdownNodeParser(), splitter] if strategy == "markdown" else [splitter]
+
+        return self._parsers[key]
+
+    def get_nodes(self, documents: Sequence[Document]) -> List[BaseNode]:
+        """Chunk documents, grouping them by file type."""
+        if self.strip_boilerplate:
+            documents = strip_repeated_lines(documents)
+
+        by_extension = defaultdict(list)
+        for doc in documents:
+            extension = Path(doc.metadata.get("file_path", "")).suffix.lower()
+            by_extension[extension].append(doc)
+
+        nodes = []
+        for extension, docs in by_extension.items():
+            parsed = docs
+            for parser in self._parser(extension):
+                parsed = parser(parsed)
+            nodes.extend(parsed)
+
+        return nodes
+
+
+def strip_repeated_lines(documents: Sequence[Document], min_repeats: int = 3) -> List[Document]:
+    """Remove page headers/footers repeated across pages of the same file.
+
+    PDFs load as one document per page; a line (digits ignored, so page
+    numbers still match) that shows up on at least half the pages of a file,
+    and at least `min_repeats` times, is treated as boilerplate.
+    """
+    pages = defaultdict(list)
+    for doc in documents:
+        pages[doc.metadata.get("file_path")].append(doc)
+
+    def normalize(line):
+        return re.sub(r"\d+", "#", line.strip().lower())
+
+    result = []
+    for docs in pages.values():
+        if len(docs) < min_repeats:
+            result.extend(docs)
+            continue
+
+        counts = Counter()
+        for doc in docs:
+            counts.update({normalize(line) for line in doc.text.splitlines() if line.strip()})
+
+        threshold = max(min_repeats, len(docs) / 2)
+        boilerplate = {line for line, count in counts.items() if count >= threshold}
+
+        if not boilerplate:
+            result.extend(docs)
+            continue
+
+        for doc in docs:
+            kept = [line for line in doc.text.splitlines() if normalize(line) not in boilerplate]
+            doc.set_content("\n".join(kept))
+            result.append(doc)
+
+    return result
+
+
+class ChunkDeduplicator:
+    """Drop near-duplicate chunks before they are embedded.
+
+    Each chunk gets a MinHash signature over word shingles; LSH banding finds
+    candidate matches and the estimated Jaccard similarity decides. The first
+    file indexed with a chunk keeps it; later near-copies are not stored.
+    Signatures are persisted per file in STORAGE_DIR (every
+    PERSIST_INTERVAL_SECONDS and on close()) so dedup works across
+    incremental index calls and files can be removed again. Files whose
+    chunks were dropped as copies of another file's chunks are recorded as
+    its dependents, so they can be re-indexed (restoring those chunks) when
+    that file changes or is removed.
+    """
+
+    PRIME = 4294967311  # smallest prime above 2**32
+
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.storage_path = Path(storage_path) if storage_path else None
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2**31 - 1, size=(num_perm, 1)).astype(np.uint64)
+        self._b = rng.randint(0, 2**31 - 1, size=(num_perm, 1)).astype(np.uint64)
+
+        # file_path -> uint32 signatures of the chunks stored for it
+        self.signatures: Dict[str, List[np.ndarray]] = {}
+        # (band, band bytes) -> {(file_path, chunk position)}
+        self._buckets = defaultdict(set)
+        # file_path -> files with chunks dropped as copies of its chunks
+        self.dependents: Dict[str, Set[str]] = defaultdict(set)
+        # file_path -> stacked signatures as last saved, reused by the next save
+        self._stacked: Dict[str, np.ndarray] = {}
+
+        self._lock = threading.RLock()
+        self._saver = DeferredSave(self._save, persist_interval(), name="save chunk signatures")
+        self._load()
+
+    @classmethod
+    def from_env(cls, storage_dir: str, namespace: str = "knowledge_embeddings") -> Optional["ChunkDeduplicator"]:
+        """Build a deduplicator unless CHUNK_DEDUP=false.
+
+        Each embeddings table (namespace) keeps its own signatures.
+        """
+        if os.getenv("CHUNK_DEDUP", "true").lower() != "true":
+            return None
+
+        filename = "chunk_signatures.pkl" if namespace == "knowledge_embeddings" else f"chunk_signatures_{namespace}.pkl"
+        return cls(
+            storage_path=str(Path(storage_dir) / filename),
+            threshold=float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.85"))
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a chunk's word shingles."""
+        words = re.findall(r"\w+", text.lower())
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(len(words) - n + 1, 1))}
+
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        return ((self._a * hashes + self._b) % self.PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _find_duplicate(self, signature: np.ndarray) -> Optional[str]:
+        """File holding a stored near-copy of the chunk, if any."""
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+
+        for path, i in candidates:
+            if (self.signatures[path][i] == signature).mean() >= self.threshold:
+                return path
+        return None
+
+    def _add(self, path: str, signature: np.ndarray):
+        self._stacked.pop(path, None)
+        signatures = self.signatures.setdefault(path, [])
+        for key in self._band_keys(signature):
+            self._buckets[key].add((path, len(signatures)))
+        signatures.append(signature)
+
+    def filter(self, nodes: Sequence[BaseNode]) -> List[BaseNode]:
+        """Return nodes that are not near-duplicates of stored chunks.
+
+        Signatures of kept nodes are recorded under their file_path, so
+        repeats within the same batch are dropped as well.
+        """
+        kept = []
+
+        with self._lock:
+            for node in nodes:
+                path = node.metadata.get("file_path")
+                signature = self.signature(node.get_content())
+                source = self._find_duplicate(signature)
+                if source is not None:
+                    if source != path:
+                        self.dependents[source].add(path)
+                    continue
+
+                kept.append(node)
+                self._add(path, signature)
+
+        self._saver.mark()
+        return kept
+
+    def stored(self, nodes: Sequence[BaseNode]) -> List[BaseNode]:
+        """Nodes that filter() kept when their file was indexed (read-only)."""
+        kept = {
+            path: {signature.tobytes() for signature in signatures}
+            for path, signatures in self.signatures.items()
+        }
+        return [
+            node for node in nodes
+            if self.signature(node.get_content()).tobytes() in kept.get(node.metadata.get("file_path"), ())
+        ]
+
+    def dependents_of(self, file_paths: Sequence[str]) -> Set[str]:
+        """Other files that lost chunks to copies in these files."""
+        found = set()
+        for path in file_paths:
+            found |= self.dependents.get(path, set())
+        return found - set(file_paths)
+
+    def remove(self, file_paths: Sequence[str]) -> Set[str]:
+        """Forget signatures of files being removed or re-indexed.
+
+        Returns:
+            Files whose dropped chunks relied on the removed signatures;
+            re-index them to restore those chunks
+        """
+        with self._lock:
+            dependents = self.dependents_of(file_paths)
+            removed = bool(dependents)
+            for path in file_paths:
+                removed |= bool(self.dependents.pop(path, None))
+                for others in self.dependents.values():
+                    if path in others:
+                        others.discard(path)
+                        removed = True
+                self._stacked.pop(path, None)
+                signatures = self.signatures.pop(path, None)
+                if signatures is None:
+                    continue
+                removed = True
+                for i, signature in enumerate(signatures):
+                    for key in self._band_keys(signature):
+                        self._buckets[key].discard((path, i))
+
+        if removed:
+            self._saver.mark()
+
+        return dependents
+
+    def close(self):
+        """Save pending changes."""
+        self._saver.flush()
+
+    def _load(self):
+        if self.storage_path is None or not self.storage_path.exists():
+            return
+        try:
+            with open(self.storage_path, "rb") as f:
+                signatures = pickle.load(f)
+        except Exception as e:
+            print(f"Warning: could not load chunk signatures: {e}", file=sys.stderr)
+            return
+
+        # Older files hold only {file_path: signatures}
+        dependents = {}
+        if "signatures" in signatures and isinstance(signatures["signatures"], dict):
+            dependents = signatures.get("dependents", {})
+            signatures = signatures["signatures"]
+
+        for path, stacked in signatures.items():
+            for signature in stacked:
+                self._add(path, signature)
+            self._stacked[path] = np.asarray(stacked)
+        for path, others in dependents.items():
+            self.dependents[path] = set(others)
+
+    def _save(self):
+        if self.storage_path is None:
+            return
+        tmp_path = self.storage_path.with_suffix(".tmp")
+        with self._lock, open(tmp_path, "wb") as f:
+            for path, sigs in self.signatures.items():
+                if sigs and path not in self._stacked:
+                    self._stacked[path] = np.vstack(sigs)
+            pickle.dump({
+                "signatures": self._stacked,
+                "dependents": {path: others for path, others in self.dependents.items() if others}
+            }, f)
+        os.replace(tmp_path, self.storage_path)
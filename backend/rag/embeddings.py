@@ -1,18 +1,67 @@
 """Local embedding model setup - no LLM API calls."""
+import hashlib
+import json
 import os
+import re
+from pathlib import Path
+from typing import Any, List, Optional
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.embeddings.huggingface.utils import (
+    get_query_instruct_for_model_name, get_text_instruct_for_model_name
+)
 from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
 
+# Tables created before per-model tables existed keep their name
+LEGACY_TABLES = {"BAAI/bge-small-en-v1.5": "knowledge_embeddings"}
 
-def setup_embeddings():
-    """Configure local embedding model (no API costs)."""
-    model_name = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
-    device = os.getenv("EMBEDDING_DEVICE", "cpu")
+# Loaded models and their dimensions, keyed by model name
+_models = {}
+_dimensions = {}
 
-    embed_model = HuggingFaceEmbedding(
-        model_name=model_name,
-        device=device
-    )
+
+def get_embedding_model_name():
+    """Name of the configured local embedding model."""
+    return os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+
+
+def load_embedding_model(model_name: str = None):
+    """Load (once) a local embedding model without touching global Settings."""
+    model_name = model_name or get_embedding_model_name()
+
+    if model_name not in _models:
+        backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+        if backend == "onnx":
+            _models[model_name] = OnnxEmbedding(
+                model_name=model_name,
+                cache_dir=get_onnx_cache_dir(),
+                quantize=os.getenv("EMBEDDING_ONNX_QUANTIZE", "false").lower() == "true",
+                threads=int(os.getenv("EMBEDDING_THREADS", "0"))
+            )
+        else:
+            device = os.getenv("EMBEDDING_DEVICE", "cpu")
+            _models[model_name] = BatchQueryHuggingFaceEmbedding(
+                model_name=model_name,
+                device=device
+            )
+
+    return _models[model_name]
+
+
+def release_embedding_model(model_name: str):
+    """Drop a loaded model (e.g. after a cutover to another one) so its memory can be freed.
+
+    Callers still holding the model keep working; the next
+    load_embedding_model for it loads it again.
+    """
+    _models.pop(model_name, None)
+
+
+def setup_embeddings(model_name: str = None):
+    """Configure local embedding model (no API costs)."""
+    embed_model = load_embedding_model(model_name)
 
     # CRITICAL: Do NOT set Settings.llm
     # Claude.ai is the LLM - local backend only does retrieval
@@ -21,7 +70,267 @@ def setup_embeddings():
     return embed_model
 
 
-def get_embedding_dimension():
-    """Get embedding dimension for vector store setup."""
-    # BGE-small-en-v1.5 uses 384 dimensions
-    return 384
+def get_embedding_dimension(model_name: str = None):
+    """Get embedding dimension for vector store setup, detected from the model."""
+    model_name = model_name or get_embedding_model_name()
+
+    if model_name not in _dimensions:
+        embed_model = load_embedding_model(model_name)
+        sentence_model = getattr(embed_model, "_model", None)
+        dimension = None
+
+        if hasattr(sentence_model, "get_sentence_embedding_dimension"):
+            dimension = sentence_model.get_sentence_embedding_dimension()
+        if not dimension:
+            # Fall back to probing the model
+            dimension = len(embed_model.get_text_embedding("dimension probe"))
+
+        _dimensions[model_name] = dimension
+
+    return _dimensions[model_name]
+
+
+def get_table_name(model_name: str = None):
+    """Embeddings table for a model, so each model gets its own namespace."""
+    model_name = model_name or get_embedding_model_name()
+
+    if model_name in LEGACY_TABLES:
+        return LEGACY_TABLES[model_name]
+
+    # Stay well inside Postgres' 63 character identifier limit
+    slug = re.sub(r"[^a-z0-9]+", "_", model_name.lower()).strip("_")[:12]
+    digest = hashlib.sha1(model_name.encode()).hexdigest()[:6]
+    return f"knowledge_embeddings_{slug}_{digest}"
+
+
+def get_onnx_cache_dir():
+    """Where exported ONNX models are kept."""
+    return os.getenv("EMBEDDING_ONNX_DIR", os.path.join(os.getenv("STORAGE_DIR", "../data/storage"), "onnx"))
+
+
+def export_onnx_model(model_name: str, cache_dir: str, quantize: bool = False) -> Path:
+    """Export a sentence-transformers model to ONNX (once) and return its path.
+
+    The transformer is exported with dynamic batch/sequence axes; pooling
+    settings and the tokenizer are saved next to it so inference needs
+    neither torch nor sentence-transformers. With `quantize`, an int8
+    dynamically quantized copy is produced as well.
+    """
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", model_name).strip("_")
+    export_dir = Path(cache_dir) / slug
+    model_path = export_dir / "model.onnx"
+
+    if not model_path.exists():
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        export_dir.mkdir(parents=True, exist_ok=True)
+        sentence_model = SentenceTransformer(model_name, device="cpu")
+        transformer = sentence_model[0]
+        pooling = sentence_model[1].get_pooling_mode_str() if len(sentence_model) > 1 else "mean"
+
+        dummy = transformer.tokenizer(["dimension probe"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+
+        transformer.auto_model.eval()
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer.auto_model,
+                tuple(dummy[name] for name in input_names),
+                str(model_path),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+
+        transformer.tokenizer.save_pretrained(str(export_dir))
+        (export_dir / "pooling.json").write_text(json.dumps({
+            "pooling": pooling,
+            "max_length": sentence_model.max_seq_length
+        }))
+
+    if not quantize:
+        return model_path
+
+    quantized_path = export_dir / "model.int8.onnx"
+    if not quantized_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+
+    return quantized_path
+
+
+class BatchQueryHuggingFaceEmbedding(HuggingFaceEmbedding):
+    """HuggingFaceEmbedding that can embed many queries in one forward pass."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HuggingFaceEmbedding"
+
+    def get_query_embedding_batch(self, queries: List[str]) -> List[List[float]]:
+        """Query embeddings (with the model's query prompt) for many queries at once.
+
+        Same as get_query_embedding per query: SentenceTransformer.encode
+        with the "query" prompt HuggingFaceEmbedding registers on the model.
+        """
+        embeddings = self._model.encode(
+            queries,
+            batch_size=self.embed_batch_size,
+            prompt_name="query",
+            normalize_embeddings=getattr(self, "normalize", True)
+        )
+        return embeddings.tolist()
+
+
+class OnnxEmbedding(BaseEmbedding):
+    """Sentence-transformers model run through onnxruntime on CPU.
+
+    Produces the same vectors as HuggingFaceEmbedding (same instructions,
+    pooling and normalization) without eager PyTorch at query time.
+    """
+
+    max_length: int = 512
+    pooling: str = "cls"
+    query_instruction: Optional[str] = None
+    text_instruction: Optional[str] = None
+
+    _session: Any = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: str,
+        quantize: bool = False,
+        threads: int = 0,
+        embed_batch_size: int = 32,
+        **kwargs: Any
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_path = export_onnx_model(model_name, cache_dir, quantize=quantize)
+        settings = json.loads((model_path.parent / "pooling.json").read_text())
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        super().__init__(
+            model_name=model_name,
+            embed_batch_size=embed_batch_size,
+            max_length=settings["max_length"],
+            pooling=settings["pooling"],
+            query_instruction=get_query_instruct_for_model_name(model_name),
+            text_instruction=get_text_instruct_for_model_name(model_name),
+            **kwargs
+        )
+        self._session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._tokenizer = AutoTokenizer.from_pretrained(str(model_path.parent))
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OnnxEmbedding"
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        encoded = self._tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        feed = {
+            item.name: encoded[item.name].astype(np.int64)
+            for item in self._session.get_inputs() if item.name in encoded
+        }
+        hidden = self._session.run(None, feed)[0]
+
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = encoded["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._encode([(self.query_instruction or "") + query])[0]
+
+    def _get_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        return self._encode([(self.query_instruction or "") + query for query in queries])
+
+    def get_query_embedding_batch(self, queries: List[str]) -> List[List[float]]:
+        """Query embeddings for many queries in one session run."""
+        return self._get_query_embeddings(queries)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._encode([(self.text_instruction or "") + text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._encode([(self.text_instruction or "") + text for text in texts])
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embedding(text)
+
+
+def check_onnx_parity(
+    model_name: str = None,
+    texts: List[str] = None,
+    quantize: bool = False,
+    min_cosine: float = None
+) -> dict:
+    """Compare ONNX vectors against the PyTorch model.
+
+    Args:
+        model_name: Model to compare (default: EMBEDDING_MODEL)
+        texts: Sample texts (embedded both as queries and as documents)
+        quantize: Check the int8 quantized export
+        min_cosine: Required minimum cosine similarity
+            (default 0.999, or 0.98 for int8)
+
+    Returns:
+        dict with min/mean cosine similarity and pass/fail
+    """
+    import numpy as np
+
+    model_name = model_name or get_embedding_model_name()
+    texts = texts or [
+        "Personal knowledge management helps people organize what they learn.",
+        "How do vector databases index embeddings?",
+        "Intermittent fasting benefits and risks",
+        "The quarterly report is confidential and for internal use only.",
+    ]
+    min_cosine = min_cosine if min_cosine is not None else (0.98 if quantize else 0.999)
+
+    torch_model = HuggingFaceEmbedding(model_name=model_name, device="cpu")
+    onnx_model = OnnxEmbedding(model_name=model_name, cache_dir=get_onnx_cache_dir(), quantize=quantize)
+
+    reference = np.array(
+        [torch_model.get_query_embedding(t) for t in texts] + torch_model.get_text_embedding_batch(texts)
+    )
+    candidate = np.array(
+        [onnx_model.get_query_embedding(t) for t in texts] + onnx_model.get_text_embedding_batch(texts)
+    )
+
+    cosines = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    )
+
+    return {
+        "model": model_name,
+        "quantized": quantize,
+        "min_cosine": round(float(cosines.min()), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "threshold": min_cosine,
+        "passed": bool(cosines.min() >= min_cosine)
+    }
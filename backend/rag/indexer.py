@@ -1,44 +1,143 @@
 """Document indexing without LLM calls."""
+import hashlib
 import os
+import sys
+import threading
+from collections import Counter
 from pathlib import Path
-from typing import List
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, StorageContext
+from typing import Callable, Iterable, List
+from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
+from llama_index.core.vector_stores.types import FilterOperator, MetadataFilter, MetadataFilters
 from llama_index.vector_stores.postgres import PGVectorStore
-from sqlalchemy import make_url
-from .embeddings import setup_embeddings, get_embedding_dimension
+from sqlalchemy import make_url, text
+from metrics import stage
+from .catalog import DocumentCatalog, ModelRegistry
+from .chunking import Chunker, ChunkDeduplicator
+from .local_store import LocalVectorStore
+from .phrases import PhraseIndex
+from .embeddings import (
+    get_embedding_dimension, get_embedding_model_name, get_table_name, load_embedding_model, setup_embeddings
+)
+from .quantization import QuantizedVectorIndex, get_hnsw_params
+
+# Document types picked up from the documents directory
+SUPPORTED_EXTENSIONS = [".pdf", ".txt", ".md", ".docx"]
+
+
+def is_document(path) -> bool:
+    """Supported document type, skipping hidden files and editor temp files."""
+    name = Path(path).name
+    if name.startswith(".") or name.startswith("~$"):
+        return False
+    return Path(path).suffix.lower() in SUPPORTED_EXTENSIONS
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of file contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 class DocumentIndexer:
-    """Index documents into pgvector using local embeddings."""
+    """Index documents into pgvector (or the embedded store) using local embeddings."""
 
-    def __init__(self, db_url: str, storage_dir: str):
+    def __init__(self, db_url: str, storage_dir: str, model_name: str = None, activate: bool = True):
+        """
+        Args:
+            db_url: Catalog database URL; also holds the vectors unless
+                VECTOR_BACKEND=local (then any SQLAlchemy URL, e.g. SQLite)
+            storage_dir: Directory for local index state
+            model_name: Embedding model; defaults to the active model in the
+                registry, or EMBEDDING_MODEL on first run
+            activate: Install this model as the global Settings.embed_model
+                (False for shadow indexes built next to the active one)
+        """
         self.db_url = db_url
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(parents=True, exist_ok=True)
 
+        # Each model gets its own embeddings table
+        self.registry = ModelRegistry(db_url)
+        active = self.registry.get_active()
+        self.model_name = model_name or active or get_embedding_model_name()
+        configured = os.getenv("EMBEDDING_MODEL")
+        if model_name is None and active and configured and configured != active:
+            print(
+                f"Warning: EMBEDDING_MODEL={configured} is ignored, the index uses {active}; "
+                "switch with the switch_embedding_model tool",
+                file=sys.stderr
+            )
+        self.table_name = get_table_name(self.model_name)
+
         # Setup local embeddings
-        setup_embeddings()
-
-        # Setup vector store
-        self.vector_store = PGVectorStore.from_params(
-            database=make_url(db_url).database,
-            host=make_url(db_url).host,
-            password=make_url(db_url).password,
-            port=make_url(db_url).port,
-            user=make_url(db_url).username,
-            table_name="knowledge_embeddings",
-            embed_dim=get_embedding_dimension()
-        )
+        self.embed_model = setup_embeddings(self.model_name) if activate else load_embedding_model(self.model_name)
+        self.dimension = get_embedding_dimension(self.model_name)
 
-        self.storage_context = StorageContext.from_defaults(
-            vector_store=self.vector_store
-        )
+        self.registry.register(self.model_name, self.table_name, self.dimension)
+        if activate and self.registry.get_active() is None:
+            self.registry.activate(self.model_name)
+
+        # pgvector (default) or the embedded mmap + HNSW store in storage_dir
+        self.backend = os.getenv("VECTOR_BACKEND", "pgvector").lower()
+        use_hnsw = os.getenv("VECTOR_INDEX", "hnsw" if self.backend == "local" else "none").lower() == "hnsw"
+
+        if self.backend == "local":
+            if os.getenv("VECTOR_STORAGE", "float32").lower() != "float32":
+                print("Warning: VECTOR_STORAGE only applies to pgvector, local store keeps float32", file=sys.stderr)
+            self.quantized_index = None
+            self.vector_store = LocalVectorStore(
+                self.storage_dir / "vectors" / self.table_name,
+                embed_dim=self.dimension,
+                hnsw_kwargs=get_hnsw_params() if use_hnsw else None
+            )
+        else:
+            # Reduced-precision ANN index (VECTOR_STORAGE=halfvec|binary), None for float32
+            self.quantized_index = QuantizedVectorIndex.from_env(db_url, self.table_name, self.dimension)
+
+            # Optional HNSW index on the full-precision vectors
+            use_hnsw = use_hnsw and self.quantized_index is None
+
+            # Setup vector store
+            self.vector_store = PGVectorStore.from_params(
+                database=make_url(db_url).database,
+                host=make_url(db_url).host,
+                password=make_url(db_url).password,
+                port=make_url(db_url).port,
+                user=make_url(db_url).username,
+                table_name=self.table_name,
+                embed_dim=self.dimension,
+                hnsw_kwargs=get_hnsw_params() if use_hnsw else None
+            )
+
+        # Per-document stats (chunk count, hash, ...) for list_indexed_documents
+        self.catalog = DocumentCatalog(db_url, self.model_name)
+
+        # Per file type chunking and near-duplicate chunk removal
+        self.chunker = Chunker.from_env(self.embed_model)
+        self.deduplicator = ChunkDeduplicator.from_env(storage_dir, self.table_name)
+
+        # Corpus noun phrases for related-keyword lookup (seo.analyzer)
+        self.phrases = PhraseIndex.from_env(self.embed_model, storage_dir, self.table_name)
 
         self.index = None
 
-    def index_documents(self, documents_dir: str) -> dict:
+        # Serializes writes from tool calls and the background watcher
+        self._lock = threading.RLock()
+
+        # Set by hand_over once a shadow index has taken over; writes that
+        # still reach this indexer are forwarded to it
+        self.replaced_by = None
+
+    def index_documents(self, documents_dir: str, force: bool = False) -> dict:
         """Index all documents in directory.
 
+        Files whose content hash matches the catalog are skipped unless
+        `force` is set, and catalog entries for files that no longer exist
+        are dropped along with their chunks.
+
         Returns:
             dict with indexed file count and status
         """
@@ -47,34 +146,26 @@ class DocumentIndexer:
         if not docs_path.exists():
             return {"error": "Documents directory not found", "indexed": 0}
 
-        # Load documents (supports PDF, DOCX, TXT, MD)
-        reader = SimpleDirectoryReader(
-            input_dir=str(docs_path),
-            recursive=True,
-            required_exts=[".pdf", ".txt", ".md", ".docx"]
-        )
-
-        documents = reader.load_data()
+        # Collect documents (supports PDF, DOCX, TXT, MD)
+        files = [str(p.resolve()) for p in docs_path.rglob("*") if p.is_file() and is_document(p)]
 
-        if not documents:
+        if not files:
             return {"error": "No documents found", "indexed": 0}
 
-        # Create index (embeddings computed locally, NO LLM calls)
-        self.index = VectorStoreIndex.from_documents(
-            documents,
-            storage_context=self.storage_context,
-            show_progress=True
-        )
+        result = self.index_files(files, force=force)
 
-        return {
-            "indexed": len(documents),
-            "status": "success",
-            "files": [doc.metadata.get("file_name", "unknown") for doc in documents]
-        }
+        stale = set(self.catalog.all_paths()) - set(files)
+        if stale:
+            self.remove_documents(stale)
+
+        result["removed"] = len(stale)
+        return result
 
     def add_document(self, file_path: str) -> dict:
         """Add single document to index.
 
+        Any chunks previously indexed for the same file are replaced.
+
         Args:
             file_path: Path to document file
 
@@ -84,35 +175,331 @@ class DocumentIndexer:
         if not Path(file_path).exists():
             return {"error": "File not found", "status": "failed"}
 
-        # Load single document
-        reader = SimpleDirectoryReader(input_files=[file_path])
-        documents = reader.load_data()
+        result = self.index_files([file_path])
 
-        if not documents:
+        if result["failed"]:
             return {"error": "Could not read document", "status": "failed"}
 
-        # Add to existing index or create new
-        if self.index is None:
-            self.index = VectorStoreIndex.from_documents(
-                documents,
-                storage_context=self.storage_context
-            )
-        else:
-            for doc in documents:
-                self.index.insert(doc)
-
         return {
             "status": "success",
             "file": Path(file_path).name,
-            "indexed": len(documents)
+            "indexed": result["indexed"],
+            "chunks": result["chunks"],
+            "duplicate_chunks_skipped": result["duplicate_chunks_skipped"],
+            "unchanged": bool(result["unchanged"])
         }
 
+    def index_files(self, file_paths: Iterable[str], force: bool = False) -> dict:
+        """Incrementally (re)index a batch of files.
+
+        Existing chunks for each file are dropped before the new ones are
+        inserted, so modified files never leave stale duplicates behind.
+        Files whose content hash is already in the catalog are skipped.
+
+        Args:
+            file_paths: Paths to document files
+            force: Re-embed files even if their content is unchanged
+
+        Returns:
+            dict with indexed document/chunk counts, files and failures
+        """
+        file_paths = list(file_paths)
+        if self.replaced_by is not None:
+            return self.replaced_by.index_files(file_paths, force=force)
+
+        paths = [str(Path(p).resolve()) for p in file_paths if Path(p).is_file()]
+        missing = [p for p in file_paths if not Path(p).is_file()]
+
+        # Stat before hashing: a write in between leaves a newer mtime for the next check
+        stats = {path: os.stat(path) for path in paths}
+        hashes = {path: file_hash(path) for path in paths}
+        known = {} if force else self.catalog.get_hashes(paths)
+        unchanged = [path for path in paths if known.get(path) == hashes[path]]
+        paths = [path for path in paths if path not in unchanged]
+        self.catalog.touch([
+            {"file_path": path, "bytes": stats[path].st_size, "mtime_ns": stats[path].st_mtime_ns}
+            for path in unchanged
+        ])
+
+        # Files indexed before the phrase index existed only need phrases
+        if self.phrases is not None and unchanged:
+            self._index_phrases(unchanged)
+
+        # Files that lost near-duplicate chunks to these files get them back
+        # if the copies here change: re-index them in the same batch
+        if self.deduplicator is not None and paths:
+            for path in sorted(self.deduplicator.dependents_of(paths)):
+                if path not in paths and Path(path).is_file():
+                    paths.append(path)
+                    stats[path] = os.stat(path)
+                    hashes[path] = file_hash(path)
+
+        result = {
+            "status": "success",
+            "indexed": 0,
+            "chunks": 0,
+            "duplicate_chunks_skipped": 0,
+            "files": [],
+            "unchanged": [Path(p).name for p in unchanged],
+            "failed": missing
+        }
+
+        if not paths:
+            return result
+
+        # Load documents (metadata file_path is the resolved path)
+        with stage("index.load"):
+            reader = SimpleDirectoryReader(input_files=paths)
+            documents = reader.load_data()
+
+        # Chunk up front so per-file chunk counts can be cataloged
+        with stage("index.chunk"):
+            nodes = self.chunker.get_nodes(documents)
+        total_chunks = len(nodes)
+        # Catalog counts every chunk of a file, including copies stored under another file
+        chunk_counts = Counter(node.metadata.get("file_path") for node in nodes)
+        loaded = {doc.metadata.get("file_path") for doc in documents}
+        indexed = [path for path in paths if path in loaded]
+
+        with self._lock:
+            if self.replaced_by is not None:
+                return self.replaced_by.index_files(file_paths, force=force)
+
+            index = self.get_index()
+
+            # One delete for the whole batch
+            self._delete_file_nodes(indexed)
+
+            # Drop boilerplate already stored once (here or in another file)
+            if self.deduplicator is not None:
+                with stage("index.dedup"):
+                    self.deduplicator.remove(indexed)
+                    nodes = self.deduplicator.filter(nodes)
+
+            # Embeddings computed locally in batches, NO LLM calls
+            with stage("index.embed_store"):
+                index.insert_nodes(nodes)
+
+            if self.quantized_index is not None:
+                self.quantized_index.ensure_index()
+
+            if self.phrases is not None:
+                with stage("index.phrases"):
+                    self.phrases.remove(indexed)
+                    self.phrases.add_nodes(nodes, indexed)
+                    self.phrases.build()
+
+            self.catalog.upsert([
+                {
+                    "file_path": path,
+                    "chunk_count": chunk_counts.get(path, 0),
+                    "bytes": stats[path].st_size,
+                    "mtime_ns": stats[path].st_mtime_ns,
+                    "content_hash": hashes[path]
+                }
+                for path in indexed
+            ])
+
+        result["indexed"] = len(documents)
+        result["chunks"] = len(nodes)
+        result["duplicate_chunks_skipped"] = total_chunks - len(nodes)
+        result["files"] = [Path(p).name for p in indexed]
+        result["failed"] = missing + [p for p in paths if p not in indexed]
+        return result
+
+    def remove_document(self, file_path: str) -> dict:
+        """Drop all chunks indexed for a file.
+
+        Args:
+            file_path: Path the document was indexed from
+
+        Returns:
+            dict with status
+        """
+        result = self.remove_documents([file_path])
+        response = {"status": "success", "file": Path(file_path).name, "removed": True}
+        if "restored" in result:
+            response["restored"] = result["restored"]
+        return response
+
+    def remove_documents(self, file_paths: Iterable[str]) -> dict:
+        """Drop all chunks indexed for a batch of files.
+
+        Vector rows go in one delete and the phrase index is rebuilt once
+        for the whole batch. Files whose near-duplicate chunks were only
+        stored under the removed ones are re-indexed so their content
+        stays searchable.
+
+        Args:
+            file_paths: Paths the documents were indexed from
+
+        Returns:
+            dict with removed file names (and restored ones, if any)
+        """
+        paths = sorted({str(Path(p).resolve()) for p in file_paths})
+        result = {"status": "success", "removed": [Path(p).name for p in paths]}
+        if not paths:
+            return result
+
+        dependents = set()
+        with self._lock:
+            if self.replaced_by is not None:
+                return self.replaced_by.remove_documents(paths)
+
+            self._delete_file_nodes(paths)
+            self.catalog.remove(paths)
+            if self.deduplicator is not None:
+                dependents = self.deduplicator.remove(paths)
+            if self.phrases is not None:
+                self.phrases.remove(paths)
+                # index_files rebuilds when dependents get restored
+                if not dependents:
+                    self.phrases.build()
+
+            if dependents:
+                restored = self.index_files(sorted(dependents), force=True)
+                result["restored"] = restored["files"]
+                if self.phrases is not None and not restored["indexed"]:
+                    self.phrases.build()
+
+        return result
+
+    def hand_over(self, successor: "DocumentIndexer", documents_dir: str, cutover: Callable[[], None]) -> dict:
+        """Bring a shadow index up to date and switch to it with writes blocked.
+
+        Holds this indexer's write lock while the successor runs a final
+        incremental pass over documents_dir and `cutover` switches search
+        to it, so no upload or watcher batch lands in between. Writes that
+        were already under way against this indexer are forwarded to the
+        successor afterwards.
+
+        Returns:
+            index_documents result of the final pass
+        """
+        with self._lock:
+            result = successor.index_documents(documents_dir)
+            cutover()
+            self.replaced_by = successor
+        return result
+
+    def _index_phrases(self, paths: List[str]):
+        """Add phrases of already stored files without re-embedding their chunks.
+
+        Only files the phrase index has not seen are read, and only the
+        chunks the deduplicator kept count, as when indexing normally.
+        """
+        try:
+            with self._lock:
+                backfill = [path for path in paths if path not in self.phrases.file_phrases]
+                if not backfill:
+                    return
+
+                with stage("index.phrases"):
+                    nodes = self.chunker.get_nodes(SimpleDirectoryReader(input_files=backfill).load_data())
+                    if self.deduplicator is not None:
+                        nodes = self.deduplicator.stored(nodes)
+                    self.phrases.add_nodes(nodes, backfill)
+                    self.phrases.build()
+        except Exception as e:
+            print(f"Warning: phrase backfill failed: {e}", file=sys.stderr)
+
+    def _delete_file_nodes(self, paths: List[str]):
+        """Delete vector store rows whose file_path metadata is one of paths."""
+        if not paths:
+            return
+        self.vector_store.delete_nodes(
+            filters=MetadataFilters(filters=[
+                MetadataFilter(key="file_path", value=list(paths), operator=FilterOperator.IN)
+            ])
+        )
+
+    def migrate_relative_paths(self, documents_dir: str) -> List[str]:
+        """Rewrite chunks stored under relative file paths to absolute ones.
+
+        Versions before the catalog stored file_path as given (e.g.
+        ../data/documents/x.pdf) while deletes match the resolved path, so
+        those rows would stay next to re-indexed copies. Each relative path
+        is resolved against the working directory, then by file name against
+        documents_dir. Rows of files found in neither place are kept under
+        documents_dir/<name>, where an upload of the same file replaces them.
+        Only checked while the catalog is empty, i.e. on the first start
+        after upgrading.
+
+        Args:
+            documents_dir: Directory the documents were indexed from
+
+        Returns:
+            Absolute paths of existing files whose rows were rewritten; they
+            have no catalog entry yet and should be passed to index_files
+        """
+        if self.backend == "local" or self.catalog.count():
+            return []
+
+        table = f"public.data_{self.table_name}"
+        with self.catalog.engine.connect() as conn:
+            if conn.execute(text("SELECT to_regclass(:table)"), {"table": table}).scalar() is None:
+                return []
+            paths = [row[0] for row in conn.execute(text(f"SELECT DISTINCT metadata_->>'file_path' FROM {table}"))]
+
+        relative = [path for path in paths if path and not Path(path).is_absolute()]
+        if not relative:
+            return []
+
+        rewrites, found, missing = {}, [], []
+        for path in relative:
+            in_documents_dir = Path(documents_dir) / Path(path).name
+            candidate = Path(path) if Path(path).is_file() else in_documents_dir
+            rewrites[path] = str(candidate.resolve())
+            if candidate.is_file():
+                found.append(rewrites[path])
+            else:
+                missing.append(rewrites[path])
+
+        if rewrites:
+            with self.catalog.engine.begin() as conn:
+                # metadata_ is json or jsonb depending on the llama-index version that created it
+                column_type = conn.execute(
+                    text(
+                        "SELECT data_type FROM information_schema.columns "
+                        "WHERE table_schema = 'public' AND table_name = :table AND column_name = 'metadata_'"
+                    ),
+                    {"table": f"data_{self.table_name}"}
+                ).scalar()
+                for old, new in rewrites.items():
+                    conn.execute(
+                        text(
+                            f"UPDATE {table} SET metadata_ = CAST(jsonb_set(CAST(metadata_ AS jsonb), "
+                            f"'{{file_path}}', to_jsonb(CAST(:new AS text))) AS {column_type}) "
+                            "WHERE metadata_->>'file_path' = :old"
+                        ),
+                        {"old": old, "new": new}
+                    )
+            print(f"Rewrote chunks of {len(rewrites)} files indexed under relative paths", file=sys.stderr)
+
+        if missing:
+            print(
+                f"Warning: {len(missing)} files indexed under relative paths no longer exist "
+                f"(e.g. {missing[0]}); their chunks were kept, remove_document drops them",
+                file=sys.stderr
+            )
+
+        return sorted(set(found))
+
+    def close(self):
+        """Save index state whose writes are deferred (local vector store, signatures, phrases)."""
+        if isinstance(self.vector_store, LocalVectorStore):
+            self.vector_store.close()
+        if self.deduplicator is not None:
+            self.deduplicator.close()
+        if self.phrases is not None:
+            self.phrases.close()
+
     def get_index(self):
         """Get or load existing index."""
         if self.index is None:
             # Try to load from vector store
             self.index = VectorStoreIndex.from_vector_store(
                 self.vector_store,
-                storage_context=self.storage_context
+                embed_model=self.embed_model
             )
         return self.index
@@ -0,0 +1,411 @@
+"""Embedded vector store: memory-mapped vectors + HNSW graph in STORAGE_DIR.
+
+Selected with VECTOR_BACKEND=local as an alternative to pgvector for
+single-user setups. Layout of one store directory:
+
+    vectors.f32   float32 matrix (capacity x dim), opened with np.memmap
+    hnsw.bin      hnswlib graph over the same slots (optional dependency)
+    nodes.db      SQLite: slot -> node id, text and metadata; free slots
+
+Vectors are unit-normalised on insert, so cosine similarity is a dot
+product. Without hnswlib, queries fall back to an exact NumPy scan over the
+memory-mapped matrix, which is fine for a few hundred thousand chunks.
+
+Writes are saved together every PERSIST_INTERVAL_SECONDS and on close():
+vectors are flushed, the graph is written to a temp file and renamed over
+hnsw.bin, and only then is the node table committed.
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, MetadataMode, TextNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+from rag.persistence import DeferredSave, persist_interval
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# Slots allocated at a time when the vector file grows
+MIN_CAPACITY = 1024
+
+SQL_OPERATORS = {
+    FilterOperator.EQ: "=",
+    FilterOperator.NE: "!=",
+    FilterOperator.GT: ">",
+    FilterOperator.GTE: ">=",
+    FilterOperator.LT: "<",
+    FilterOperator.LTE: "<=",
+}
+
+
+class LocalVectorStore(BasePydanticVectorStore):
+    """In-process LlamaIndex vector store with incremental adds and deletes.
+
+    Deleted slots are marked deleted in the HNSW graph and reused by later
+    inserts, so a file that is re-indexed repeatedly does not grow the
+    store. Changes are visible immediately and saved in the background
+    (see the module docstring); call close() before exiting.
+    """
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+
+    path: str
+    embed_dim: int
+    hnsw_kwargs: Optional[Dict[str, Any]] = None
+
+    _lock: Any = PrivateAttr()
+    _db: Any = PrivateAttr()
+    _vectors: Any = PrivateAttr(default=None)
+    _live: Any = PrivateAttr(default=None)
+    _graph: Any = PrivateAttr(default=None)
+    _size: int = PrivateAttr(default=0)
+    _saver: Any = PrivateAttr(default=None)
+    _unsaved_free: Any = PrivateAttr(default=None)
+
+    def __init__(self, path: str, embed_dim: int, hnsw_kwargs: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            path: Directory holding this store's files
+            embed_dim: Embedding dimension
+            hnsw_kwargs: hnsw_m, hnsw_ef_construction and hnsw_ef_search
+                (see get_hnsw_params); None for exact search only
+        """
+        super().__init__(path=str(path), embed_dim=embed_dim, hnsw_kwargs=hnsw_kwargs)
+
+        Path(path).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+
+        self._db = sqlite3.connect(str(Path(path) / "nodes.db"), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS nodes ("
+            " slot INTEGER PRIMARY KEY, node_id TEXT UNIQUE NOT NULL, text TEXT, metadata TEXT);"
+            "CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY);"
+            "CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        self._load()
+
+        # Slots freed since the last save are not reused before it: their old
+        # node is still in the committed table if the process dies first
+        self._unsaved_free = set()
+        self._saver = DeferredSave(self._persist, persist_interval(), name=f"save {Path(path).name}")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return self._db
+
+    # Storage
+
+    def _load(self):
+        """Open the vector file with mmap and the HNSW graph, if present."""
+        info = dict(self._db.execute("SELECT key, value FROM info").fetchall())
+        if info and int(info["dim"]) != self.embed_dim:
+            raise ValueError(f"{self.path} holds {info['dim']}-d vectors, expected {self.embed_dim}")
+
+        self._size = int(info.get("size", 0))
+        capacity = int(info.get("capacity", 0))
+        if capacity:
+            self._vectors = np.memmap(self._vector_file, dtype=np.float32, mode="r+", shape=(capacity, self.embed_dim))
+
+        self._live = np.zeros(capacity, dtype=bool)
+        slots = [row[0] for row in self._db.execute("SELECT slot FROM nodes")]
+        self._live[slots] = True
+
+        if self.hnsw_kwargs and hnswlib is None:
+            print("Warning: hnswlib not installed, local vector store uses exact search", file=sys.stderr)
+        if self.hnsw_kwargs and hnswlib is not None:
+            self._graph = hnswlib.Index(space="cosine", dim=self.embed_dim)
+            graph_file = Path(self.path) / "hnsw.bin"
+            if graph_file.exists() and capacity:
+                self._graph.load_index(str(graph_file), max_elements=capacity)
+            else:
+                self._graph.init_index(
+                    max_elements=max(capacity, MIN_CAPACITY),
+                    M=self.hnsw_kwargs["hnsw_m"],
+                    ef_construction=self.hnsw_kwargs["hnsw_ef_construction"]
+                )
+                if self._size:
+                    # Graph missing (e.g. hnswlib installed later): rebuild from the vectors
+                    live = np.flatnonzero(self._live[:self._size])
+                    if len(live):
+                        self._graph.add_items(self._vectors[live], live)
+
+    @property
+    def _vector_file(self) -> Path:
+        return Path(self.path) / "vectors.f32"
+
+    def _capacity(self) -> int:
+        return 0 if self._vectors is None else self._vectors.shape[0]
+
+    def _grow(self, needed: int):
+        """Extend the vector file (and graph) to hold at least `needed` slots."""
+        capacity = self._capacity()
+        if needed <= capacity:
+            return
+
+        new_capacity = max(needed, capacity * 2, MIN_CAPACITY)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+
+        with open(self._vector_file, "ab") as f:
+            f.truncate(new_capacity * self.embed_dim * 4)
+        self._vectors = np.memmap(self._vector_file, dtype=np.float32, mode="r+", shape=(new_capacity, self.embed_dim))
+        self._live = np.concatenate([self._live, np.zeros(new_capacity - len(self._live), dtype=bool)])
+
+        if self._graph is not None and new_capacity > self._graph.get_max_elements():
+            self._graph.resize_index(new_capacity)
+
+    def _allocate(self, count: int) -> List[int]:
+        """Reuse freed slots first, then append."""
+        free = [
+            row[0]
+            for row in self._db.execute(
+                "SELECT slot FROM free_slots ORDER BY slot LIMIT ?", (count + len(self._unsaved_free),)
+            )
+            if row[0] not in self._unsaved_free
+        ][:count]
+        self._db.executemany("DELETE FROM free_slots WHERE slot = ?", [(slot,) for slot in free])
+
+        appended = list(range(self._size, self._size + count - len(free)))
+        self._size += len(appended)
+        self._grow(self._size)
+        return free + appended
+
+    def _persist(self):
+        """Flush vectors, replace the graph file, then commit the node table."""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            if self._graph is not None:
+                graph_file = Path(self.path) / "hnsw.bin"
+                tmp_file = graph_file.with_suffix(".bin.tmp")
+                self._graph.save_index(str(tmp_file))
+                os.replace(tmp_file, graph_file)
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+                [("dim", str(self.embed_dim)), ("size", str(self._size)), ("capacity", str(self._capacity()))]
+            )
+            self._db.commit()
+            self._unsaved_free.clear()
+
+    def close(self):
+        """Save pending writes."""
+        self._saver.flush()
+
+    # Writes
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+
+        with self._lock:
+            # Re-adding a node id replaces it
+            self._delete_where("node_id IN (%s)" % ",".join("?" * len(nodes)), [n.node_id for n in nodes])
+
+            slots = self._allocate(len(nodes))
+            vectors = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+            self._vectors[slots] = vectors
+            self._live[slots] = True
+            if self._graph is not None:
+                self._graph.add_items(vectors, slots)
+
+            self._db.executemany(
+                "INSERT INTO nodes (slot, node_id, text, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        slot,
+                        node.node_id,
+                        node.get_content(metadata_mode=MetadataMode.NONE),
+                        json.dumps(node_to_metadata_dict(node, remove_text=True, flat_metadata=self.flat_metadata))
+                    )
+                    for slot, node in zip(slots, nodes)
+                ]
+            )
+            self._saver.mark()
+
+        return [node.node_id for node in nodes]
+
+    def _delete_where(self, clause: str, params: List) -> int:
+        """Free the slots of matching nodes (caller marks the change for saving)."""
+        slots = [row[0] for row in self._db.execute(f"SELECT slot FROM nodes WHERE {clause}", params)]
+        if not slots:
+            return 0
+
+        self._db.executemany("DELETE FROM nodes WHERE slot = ?", [(slot,) for slot in slots])
+        self._db.executemany("INSERT OR IGNORE INTO free_slots (slot) VALUES (?)", [(slot,) for slot in slots])
+        self._live[slots] = False
+        self._unsaved_free.update(slots)
+        if self._graph is not None:
+            for slot in slots:
+                self._graph.mark_deleted(slot)
+        return len(slots)
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        with self._lock:
+            if self._delete_where("json_extract(metadata, '$.doc_id') = ?", [ref_doc_id]):
+                self._saver.mark()
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        """Delete nodes by id and/or metadata filters."""
+        if not node_ids and not filters:
+            return
+
+        clauses, params = [], []
+        if node_ids:
+            clauses.append("node_id IN (%s)" % ",".join("?" * len(node_ids)))
+            params.extend(node_ids)
+        if filters:
+            clause, filter_params = self._filter_clause(filters)
+            clauses.append(clause)
+            params.extend(filter_params)
+
+        with self._lock:
+            if self._delete_where(" AND ".join(clauses), params):
+                self._saver.mark()
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._delete_where("1 = 1", []):
+                self._saver.mark()
+
+    # Reads
+
+    def export(self) -> Tuple[List[str], List[str], List[Dict], np.ndarray]:
+        """All live nodes as (node ids, texts, metadata dicts, unit vectors)."""
+        with self._lock:
+            rows = self._db.execute("SELECT slot, node_id, text, metadata FROM nodes ORDER BY slot").fetchall()
+            slots = [row[0] for row in rows]
+            matrix = np.array(self._vectors[slots]) if rows else np.zeros((0, self.embed_dim), dtype=np.float32)
+
+        return [row[1] for row in rows], [row[2] for row in rows], [json.loads(row[3]) for row in rows], matrix
+
+    def _filter_clause(self, filters: MetadataFilters) -> Tuple[str, List]:
+        """SQL over the JSON metadata column for (nested) metadata filters."""
+        parts, params = [], []
+        for item in filters.filters:
+            if isinstance(item, MetadataFilters):
+                clause, nested = self._filter_clause(item)
+                parts.append(f"({clause})")
+                params.extend(nested)
+                continue
+
+            column = f"json_extract(metadata, '$.\"{item.key}\"')"
+            if item.operator in SQL_OPERATORS:
+                parts.append(f"{column} {SQL_OPERATORS[item.operator]} ?")
+                params.append(item.value)
+            elif item.operator in (FilterOperator.IN, FilterOperator.NIN):
+                values = list(item.value)
+                negate = "NOT " if item.operator == FilterOperator.NIN else ""
+                parts.append(f"{column} {negate}IN ({','.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                raise ValueError(f"Unsupported filter operator for local vector store: {item.operator}")
+
+        joiner = " OR " if filters.condition == FilterCondition.OR else " AND "
+        return joiner.join(parts) or "1 = 1", params
+
+    def _exact(self, query: np.ndarray, top_k: int, slots: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact cosine top-k over live (or the given) slots."""
+        if slots is None:
+            slots = np.flatnonzero(self._live[:self._size])
+        if not len(slots):
+            return slots, np.zeros(0, dtype=np.float32)
+
+        scores = self._vectors[slots] @ query
+        top_k = min(top_k, len(slots))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return slots[best], scores[best]
+
+    def _search_graph(self, query: np.ndarray, top_k: int, ef_search: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k from the HNSW graph, exact scan without one."""
+        k = min(top_k, int(self._live.sum()))
+        if self._graph is None or k == 0:
+            return self._exact(query, top_k)
+
+        ef_search = ef_search or self.hnsw_kwargs["hnsw_ef_search"]
+        self._graph.set_ef(max(int(ef_search), k))
+        try:
+            labels, distances = self._graph.knn_query(query, k=k)
+        except RuntimeError:
+            # Graph could not reach k live elements (heavy deletes); scan instead
+            return self._exact(query, top_k)
+        return labels[0].astype(np.int64), 1 - distances[0]
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.query_embedding is None:
+            raise ValueError("Local vector store only supports embedding queries")
+
+        vector = np.asarray(query.query_embedding, dtype=np.float32)
+        vector /= max(np.linalg.norm(vector), 1e-12)
+        top_k = query.similarity_top_k
+
+        with self._lock:
+            if query.filters is not None:
+                clause, params = self._filter_clause(query.filters)
+                slots = np.array(
+                    [row[0] for row in self._db.execute(f"SELECT slot FROM nodes WHERE {clause}", params)],
+                    dtype=np.int64
+                )
+                slots, scores = self._exact(vector, top_k, slots)
+            else:
+                slots, scores = self._search_graph(vector, top_k, kwargs.get("hnsw_ef_search"))
+
+            rows = {}
+            if len(slots):
+                placeholders = ",".join("?" * len(slots))
+                rows = {
+                    row[0]: row[1:]
+                    for row in self._db.execute(
+                        f"SELECT slot, node_id, text, metadata FROM nodes WHERE slot IN ({placeholders})",
+                        [int(slot) for slot in slots]
+                    )
+                }
+
+        nodes, similarities, ids = [], [], []
+        for slot, score in zip(slots, scores):
+            if int(slot) not in rows:
+                continue
+            node_id, text, metadata = rows[int(slot)]
+            metadata = json.loads(metadata)
+            try:
+                node = metadata_dict_to_node(metadata)
+                node.set_content(text)
+            except Exception:
+                node = TextNode(id_=node_id, text=text, metadata=metadata)
+            nodes.append(node)
+            similarities.append(float(score))
+            ids.append(node_id)
+
+        return VectorStoreQueryResult(nodes=nodes, similarities=similarities, ids=ids)
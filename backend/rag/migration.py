@@ -0,0 +1,116 @@
+"""Background shadow indexing for switching embedding models without downtime."""
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from .indexer import DocumentIndexer
+
+
+class ModelMigration:
+    """Build a shadow index for a new embedding model, then cut over.
+
+    The new model gets its own embeddings table, filled in a background
+    thread while the active index keeps serving search. Once every document
+    is indexed (plus a catch-up pass for files changed meanwhile) the model
+    is marked active and `on_cutover` receives the new DocumentIndexer.
+    With `get_active`, the last catch-up pass and the cutover run while the
+    active indexer blocks writes (DocumentIndexer.hand_over), so uploads
+    and watcher batches arriving during the switch are not lost.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        storage_dir: str,
+        documents_dir: str,
+        on_cutover: Callable[[DocumentIndexer], None],
+        get_active: Optional[Callable[[], DocumentIndexer]] = None
+    ):
+        self.db_url = db_url
+        self.storage_dir = storage_dir
+        self.documents_dir = documents_dir
+        self.on_cutover = on_cutover
+        self.get_active = get_active
+
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict = {"state": "idle"}
+        # Guards _status and _thread (tool calls read, the build thread writes)
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, model_name: str, activate: bool = True) -> Dict:
+        """Start building a shadow index for `model_name`.
+
+        Args:
+            model_name: HuggingFace embedding model to switch to
+            activate: Cut over automatically once the shadow index is built
+
+        Returns:
+            Current migration status
+        """
+        with self._lock:
+            if self.running:
+                return {"error": "A shadow index build is already running", **self._snapshot()}
+
+            self._status = {"state": "building", "model": model_name, "started_at": time.time()}
+            self._thread = threading.Thread(target=self._build, args=(model_name, activate), daemon=True)
+            self._thread.start()
+            return self._snapshot()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return self._snapshot()
+
+    def _set_status(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+
+    def _snapshot(self) -> Dict:
+        status = dict(self._status)
+        if "started_at" in status:
+            status["elapsed_seconds"] = round(time.time() - status.pop("started_at"), 1)
+        return status
+
+    def _build(self, model_name: str, activate: bool):
+        shadow = None
+        try:
+            shadow = DocumentIndexer(self.db_url, self.storage_dir, model_name=model_name, activate=False)
+            shadow.registry.set_status(model_name, "building")
+
+            result = shadow.index_documents(self.documents_dir)
+            if "error" in result and result["error"] != "No documents found":
+                raise RuntimeError(result["error"])
+
+            # Catch files changed while the bulk build ran
+            catch_up = shadow.index_documents(self.documents_dir)
+            final = {}
+
+            if activate:
+                def cutover():
+                    shadow.registry.activate(model_name)
+                    self.on_cutover(shadow)
+
+                active = self.get_active() if self.get_active is not None else None
+                if active is not None:
+                    # Last diff and switch with writes to the active index blocked
+                    final = active.hand_over(shadow, self.documents_dir, cutover)
+                else:
+                    cutover()
+            else:
+                shadow.registry.set_status(model_name, "ready")
+
+            passes = (result, catch_up, final)
+            self._set_status(
+                state="active" if activate else "ready",
+                indexed=sum(r.get("indexed", 0) for r in passes),
+                chunks=sum(r.get("chunks", 0) for r in passes)
+            )
+        except Exception as e:
+            print(f"Shadow index build error ({model_name}): {e}", file=sys.stderr)
+            if shadow is not None:
+                shadow.registry.set_status(model_name, "failed", error=str(e))
+            self._set_status(state="failed", error=str(e))
@@ -0,0 +1,72 @@
+"""Deferred saves for on-disk index state (local vector store, phrases, dedup signatures)."""
+import os
+import sys
+import threading
+from typing import Callable, Optional
+
+
+def persist_interval() -> float:
+    """Seconds between saves of changed index files (PERSIST_INTERVAL_SECONDS, 0 = every write)."""
+    return float(os.getenv("PERSIST_INTERVAL_SECONDS", "30"))
+
+
+class DeferredSave:
+    """Coalesce saves of a component that changes often but is costly to write.
+
+    `mark()` records a change; `save` runs once `interval` seconds after the
+    first unsaved change (on a timer thread), or earlier on `flush()`. With
+    interval <= 0 every mark saves immediately. `save` must do its own
+    locking; a failed save stays pending and is retried by the next flush.
+    """
+
+    def __init__(self, save: Callable[[], None], interval: float, name: str = "save"):
+        self.save = save
+        self.interval = interval
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+
+    def mark(self):
+        """Record an unsaved change."""
+        if self.interval <= 0:
+            with self._lock:
+                self._dirty = True
+            self.flush()
+            return
+
+        with self._lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self._on_timer)
+                self._timer.name = self.name
+                self._timer.daemon = True
+                self._timer.start()
+
+    @property
+    def pending(self) -> bool:
+        return self._dirty
+
+    def flush(self):
+        """Save now if anything changed since the last save."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+
+        try:
+            self.save()
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+
+    def _on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Warning: {self.name} failed, retrying on the next save: {e}", file=sys.stderr)
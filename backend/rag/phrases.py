@@ -0,0 +1,316 @@
+"""Corpus phrase index for related-keyword lookup."""
+import math
+import os
+import pickle
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.schema import BaseNode
+
+from rag.persistence import DeferredSave, persist_interval
+
+
+def normalize_noun_chunk(chunk) -> Optional[str]:
+    """spaCy noun chunk without leading determiners/stop words; None for pronouns."""
+    tokens = [token for token in chunk if not token.is_punct and not token.is_space]
+    while tokens and (tokens[0].is_stop or tokens[0].pos_ in ("DET", "PRON", "NUM")):
+        tokens = tokens[1:]
+    if not tokens or not any(token.is_alpha for token in tokens):
+        return None
+    phrase = " ".join(token.text.lower() for token in tokens)
+    return phrase if len(phrase) > 2 else None
+
+
+class PhraseIndex:
+    """Noun phrases of the indexed chunks, their embeddings and co-occurrence.
+
+    Phrases are extracted per chunk while indexing (spaCy noun chunks, or
+    stop-word delimited word runs without the model) and counted per file,
+    so re-indexed or removed files can be subtracted again from the corpus
+    totals. `build` keeps the phrases seen in at least `min_df` chunks,
+    embeds only those not embedded before and stacks them into a normalized
+    matrix, so `related` is one matrix-vector product plus a co-occurrence
+    boost. The pickle is written every PERSIST_INTERVAL_SECONDS and on
+    close().
+    """
+
+    def __init__(
+        self,
+        embed_model,
+        storage_path: Optional[str] = None,
+        min_df: int = 2,
+        max_phrases: int = 10000,
+        max_per_chunk: int = 12,
+        spacy_model: str = "en_core_web_sm"
+    ):
+        self.embed_model = embed_model
+        self.storage_path = Path(storage_path) if storage_path else None
+        self.min_df = min_df
+        self.max_phrases = max_phrases
+        self.max_per_chunk = max_per_chunk
+        self.spacy_model = spacy_model
+
+        # file_path -> phrase -> chunks containing it
+        self.file_phrases: Dict[str, Counter] = {}
+        # file_path -> (phrase, phrase) -> chunks containing both
+        self.file_pairs: Dict[str, Counter] = {}
+        # phrase -> unit vector, for phrases in the current vocabulary
+        self.embeddings: Dict[str, np.ndarray] = {}
+
+        # Corpus totals kept in step with the per-file counts:
+        # phrase -> chunks containing it, phrase -> other phrase -> chunks with both
+        self.df = Counter()
+        self.cooccurrence: Dict[str, Counter] = defaultdict(Counter)
+        # Phrases whose co-occurrence changed since the last build
+        self._touched = set()
+
+        # (vocabulary, positions, matrix, df, neighbors) swapped in whole by build()
+        self._lookup = ([], {}, None, Counter(), {})
+        self._nlp = None
+        self._lock = threading.RLock()
+        self._saver = DeferredSave(self._save, persist_interval(), name="save phrase index")
+
+        self._load()
+
+    @classmethod
+    def from_env(cls, embed_model, storage_dir: str, namespace: str = "knowledge_embeddings") -> Optional["PhraseIndex"]:
+        """Build a phrase index unless PHRASE_INDEX=false.
+
+        Each embeddings table (namespace) keeps its own phrases and vectors.
+        """
+        if os.getenv("PHRASE_INDEX", "true").lower() != "true":
+            return None
+
+        filename = "phrases.pkl" if namespace == "knowledge_embeddings" else f"phrases_{namespace}.pkl"
+        return cls(
+            embed_model,
+            storage_path=str(Path(storage_dir) / filename),
+            min_df=int(os.getenv("PHRASE_MIN_DF", "2")),
+            max_phrases=int(os.getenv("PHRASE_MAX", "10000")),
+            spacy_model=os.getenv("SPACY_MODEL", "en_core_web_sm")
+        )
+
+    @property
+    def nlp(self):
+        """spaCy with only what noun chunks need; False if the model is missing."""
+        if self._nlp is None:
+            try:
+                import spacy
+                self._nlp = spacy.load(self.spacy_model, disable=["ner", "lemmatizer"])
+            except (ImportError, OSError):
+                print(f"Warning: {self.spacy_model} not available, phrase index uses word runs", file=sys.stderr)
+                self._nlp = False
+        return self._nlp
+
+    def extract(self, texts: Sequence[str]) -> List[List[str]]:
+        """Candidate phrases per text, most frequent first."""
+        if self.nlp:
+            phrases = [
+                [p for p in (normalize_noun_chunk(chunk) for chunk in doc.noun_chunks) if p]
+                for doc in self.nlp.pipe(texts, batch_size=64)
+            ]
+        else:
+            phrases = [self._word_runs(text) for text in texts]
+
+        return [[p for p, _ in Counter(found).most_common(self.max_per_chunk)] for found in phrases]
+
+    @staticmethod
+    def _word_runs(text: str) -> List[str]:
+        """Runs of 1-3 non-stop words between stop words and punctuation."""
+        from spacy.lang.en.stop_words import STOP_WORDS
+
+        phrases = []
+        for segment in re.split(r"[^\w\s'-]+", text.lower()):
+            run = []
+            for word in segment.split() + [""]:
+                if word and word not in STOP_WORDS and word.isalpha() and len(word) > 2:
+                    run.append(word)
+                    continue
+                if 0 < len(run) <= 3:
+                    phrases.append(" ".join(run))
+                run = []
+        return phrases
+
+    def add_nodes(self, nodes: Sequence[BaseNode], file_paths: Sequence[str] = ()):
+        """Count phrases and phrase pairs of newly stored chunks.
+
+        Args:
+            nodes: Stored chunks
+            file_paths: Files the chunks came from; each gets an entry even
+                if none of its chunks has phrases, so it counts as processed
+        """
+        chunk_phrases = self.extract([node.get_content() for node in nodes])
+
+        with self._lock:
+            for path in file_paths:
+                self.file_phrases.setdefault(path, Counter())
+                self.file_pairs.setdefault(path, Counter())
+            for node, phrases in zip(nodes, chunk_phrases):
+                path = node.metadata.get("file_path")
+                pairs = Counter(combinations(sorted(phrases), 2))
+                self.file_phrases.setdefault(path, Counter()).update(phrases)
+                self.file_pairs.setdefault(path, Counter()).update(pairs)
+                self._count(Counter(phrases), pairs, 1)
+
+    def remove(self, file_paths: Sequence[str]):
+        """Forget phrases of files being removed or re-indexed (build() applies it)."""
+        with self._lock:
+            for path in file_paths:
+                self._count(self.file_phrases.pop(path, Counter()), self.file_pairs.pop(path, Counter()), -1)
+
+    def _count(self, phrases: Counter, pairs: Counter, sign: int):
+        """Add (sign=1) or subtract (sign=-1) one file's or chunk's counts from the corpus totals."""
+        for phrase, n in phrases.items():
+            self.df[phrase] += sign * n
+            if self.df[phrase] <= 0:
+                del self.df[phrase]
+
+        for (a, b), n in pairs.items():
+            for x, y in ((a, b), (b, a)):
+                self.cooccurrence[x][y] += sign * n
+                if self.cooccurrence[x][y] <= 0:
+                    del self.cooccurrence[x][y]
+                    if not self.cooccurrence[x]:
+                        del self.cooccurrence[x]
+            self._touched.update((a, b))
+
+    def build(self, persist: bool = True):
+        """Refresh the lookup matrix after add_nodes/remove.
+
+        Works from the corpus totals, so its cost does not grow with the
+        number of files; neighbors are re-derived only for phrases whose
+        co-occurrence changed unless the vocabulary itself changed. Call it
+        once per indexing batch rather than per file.
+
+        Args:
+            persist: Schedule a save of the pickle
+        """
+        with self._lock:
+            df = self.df
+            previous = set(self._lookup[0])
+
+            vocabulary = [p for p, n in df.most_common(self.max_phrases) if n >= self.min_df]
+
+            missing = [p for p in vocabulary if p not in self.embeddings]
+            if missing:
+                vectors = np.asarray(self.embed_model.get_text_embedding_batch(missing), dtype=np.float32)
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                self.embeddings.update(zip(missing, vectors))
+
+            # Only vocabulary phrases keep their vectors
+            self.embeddings = {p: self.embeddings[p] for p in vocabulary}
+
+            kept = set(vocabulary)
+            if kept == previous:
+                neighbors = dict(self._lookup[4])
+                stale = self._touched & kept
+            else:
+                neighbors = {}
+                stale = kept
+            for phrase in stale:
+                counts = Counter({
+                    other: n for other, n in self.cooccurrence.get(phrase, Counter()).items() if other in kept
+                })
+                if counts:
+                    neighbors[phrase] = counts
+                else:
+                    neighbors.pop(phrase, None)
+            self._touched = set()
+
+            matrix = np.vstack([self.embeddings[p] for p in vocabulary]) if vocabulary else None
+            positions = {p: i for i, p in enumerate(vocabulary)}
+            self._lookup = (vocabulary, positions, matrix, Counter({p: df[p] for p in vocabulary}), neighbors)
+            if persist:
+                self._saver.mark()
+
+    def close(self):
+        """Save pending changes."""
+        self._saver.flush()
+
+    def related(self, topic: str, top_k: int = 10, cooccurrence_weight: float = 0.3) -> List[Dict]:
+        """Corpus phrases semantically related to a topic.
+
+        Args:
+            topic: Topic or keyword
+            top_k: Number of phrases to return
+            cooccurrence_weight: Boost for phrases that share chunks with the
+                topic's nearest phrases
+
+        Returns:
+            List of {phrase, score, similarity, chunks} dicts, best first
+        """
+        vocabulary, positions, matrix, df, neighbors = self._lookup
+        if matrix is None or not topic.strip():
+            return []
+
+        query = np.asarray(self.embed_model.get_text_embedding(topic), dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        similarities = matrix @ query
+
+        # Nearest phrases, then phrases that appear alongside the closest few
+        count = min(top_k * 3, len(vocabulary))
+        nearest = np.argpartition(-similarities, count - 1)[:count]
+        nearest = nearest[np.argsort(-similarities[nearest])]
+
+        scores = {vocabulary[i]: float(similarities[i]) for i in nearest}
+        for anchor in [vocabulary[i] for i in nearest[:3]]:
+            for phrase, n in neighbors.get(anchor, Counter()).most_common(top_k):
+                # Co-occurrence normalized by how common both phrases are
+                boost = cooccurrence_weight * n / math.sqrt(df[anchor] * df[phrase])
+                similarity = float(similarities[positions[phrase]])
+                scores[phrase] = max(scores.get(phrase, similarity), similarity + boost)
+
+        topic_lower = topic.strip().lower()
+        ranked = sorted((p for p in scores if p != topic_lower), key=lambda p: -scores[p])[:top_k]
+        return [
+            {
+                "phrase": p,
+                "score": round(scores[p], 4),
+                "similarity": round(float(similarities[positions[p]]), 4),
+                "chunks": df[p]
+            }
+            for p in ranked
+        ]
+
+    def stats(self) -> Dict:
+        vocabulary, _, _, _, neighbors = self._lookup
+        return {
+            "files": len(self.file_phrases),
+            "phrases": len(vocabulary),
+            "cooccurring_phrases": len(neighbors)
+        }
+
+    def _load(self):
+        if self.storage_path is None or not self.storage_path.exists():
+            return
+        try:
+            with open(self.storage_path, "rb") as f:
+                state = pickle.load(f)
+        except Exception as e:
+            print(f"Warning: could not load phrase index: {e}", file=sys.stderr)
+            return
+
+        self.file_phrases = state["file_phrases"]
+        self.file_pairs = state["file_pairs"]
+        self.embeddings = state["embeddings"]
+        for path in self.file_phrases:
+            self._count(self.file_phrases[path], self.file_pairs.get(path, Counter()), 1)
+        self.build(persist=False)
+
+    def _save(self):
+        if self.storage_path is None:
+            return
+        tmp_path = self.storage_path.with_suffix(".tmp")
+        with self._lock, open(tmp_path, "wb") as f:
+            pickle.dump({
+                "file_phrases": self.file_phrases,
+                "file_pairs": self.file_pairs,
+                "embeddings": self.embeddings
+            }, f)
+        os.replace(tmp_path, self.storage_path)
@@ -0,0 +1,183 @@
+"""Reduced-precision vector search over pgvector with full-precision re-ranking."""
+import os
+from typing import List, Optional
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+from sqlalchemy import create_engine, text
+
+# float32: plain vector(dim) column, optionally with an HNSW index
+# halfvec: HNSW index over embedding::halfvec(dim) (half the index size)
+# binary:  HNSW index over binary_quantize(embedding)::bit(dim) (1/32 the size)
+STORAGE_MODES = ("float32", "halfvec", "binary")
+
+# Largest hnsw.ef_search pgvector accepts; an HNSW scan returns at most
+# ef_search rows, so candidates are capped to match
+MAX_EF_SEARCH = 1000
+
+
+def get_hnsw_params() -> dict:
+    """HNSW build/search parameters from the environment."""
+    return {
+        "hnsw_m": int(os.getenv("HNSW_M", "16")),
+        "hnsw_ef_construction": int(os.getenv("HNSW_EF_CONSTRUCTION", "64")),
+        "hnsw_ef_search": int(os.getenv("HNSW_EF_SEARCH", "40")),
+    }
+
+
+def vector_literal(embedding: List[float]) -> str:
+    """pgvector text representation of an embedding."""
+    return "[" + ",".join(f"{x:.7g}" for x in embedding) + "]"
+
+
+class QuantizedVectorIndex:
+    """Search a compact halfvec/binary HNSW index, then re-rank exactly.
+
+    The full-precision vectors stay in the embeddings table; only the ANN
+    index (the part that has to stay in RAM) is built over the quantized
+    expression. Candidates are over-fetched from the compact index and
+    re-ordered by exact cosine distance on the float32 vectors.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        table_name: str,
+        dimension: int,
+        mode: str = "halfvec",
+        candidate_factor: int = 4,
+        min_candidates: int = 40,
+        hnsw_params: Optional[dict] = None,
+        schema_name: str = "public"
+    ):
+        if mode not in STORAGE_MODES or mode == "float32":
+            raise ValueError(f"Unsupported quantized storage mode: {mode}")
+
+        self.engine = create_engine(db_url)
+        # PGVectorStore prefixes its tables with "data_"
+        self.table = f"{schema_name}.data_{table_name}"
+        self.index_name = f"{table_name}_{mode}_hnsw_idx"
+        self.dimension = dimension
+        self.mode = mode
+        self.candidate_factor = candidate_factor
+        self.min_candidates = min_candidates
+        self.hnsw_params = hnsw_params or get_hnsw_params()
+        self._index_ready = False
+
+    @classmethod
+    def from_env(cls, db_url: str, table_name: str, dimension: int) -> Optional["QuantizedVectorIndex"]:
+        """Build from VECTOR_STORAGE; None for plain float32 storage."""
+        mode = os.getenv("VECTOR_STORAGE", "float32").lower()
+        if mode not in STORAGE_MODES:
+            raise ValueError(f"VECTOR_STORAGE must be one of {', '.join(STORAGE_MODES)}")
+        if mode == "float32":
+            return None
+
+        return cls(
+            db_url,
+            table_name,
+            dimension,
+            mode=mode,
+            candidate_factor=int(os.getenv("VECTOR_RERANK_FACTOR", "4")),
+            min_candidates=int(os.getenv("VECTOR_RERANK_MIN_CANDIDATES", "40"))
+        )
+
+    def _key_expression(self) -> str:
+        """Quantized expression the ANN index is built on."""
+        if self.mode == "halfvec":
+            return f"(embedding::halfvec({self.dimension}))"
+        return f"(binary_quantize(embedding)::bit({self.dimension}))"
+
+    def _order_expression(self) -> str:
+        """Distance between the indexed expression and the :query parameter."""
+        dim = self.dimension
+        if self.mode == "halfvec":
+            return f"embedding::halfvec({dim}) <=> CAST(:query AS halfvec({dim}))"
+        return f"binary_quantize(embedding)::bit({dim}) <~> binary_quantize(CAST(:query AS vector({dim})))"
+
+    def ensure_index(self) -> bool:
+        """Create the quantized HNSW index if the embeddings table exists.
+
+        Returns:
+            True once the index is available
+        """
+        if self._index_ready:
+            return True
+
+        ops = "halfvec_cosine_ops" if self.mode == "halfvec" else "bit_hamming_ops"
+
+        with self.engine.begin() as conn:
+            if conn.execute(text("SELECT to_regclass(:table)"), {"table": self.table}).scalar() is None:
+                return False
+
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {self.index_name} ON {self.table} "
+                f"USING hnsw ({self._key_expression()} {ops}) "
+                f"WITH (m = {int(self.hnsw_params['hnsw_m'])}, "
+                f"ef_construction = {int(self.hnsw_params['hnsw_ef_construction'])})"
+            ))
+
+        self._index_ready = True
+        return True
+
+    def query(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        candidates: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> List[NodeWithScore]:
+        """Approximate search on the quantized index with exact re-ranking.
+
+        Args:
+            query_embedding: Full-precision query vector
+            top_k: Number of results to return
+            candidates: Candidates fetched from the quantized index (at most
+                MAX_EF_SEARCH)
+            ef_search: HNSW search breadth (raised to at least `candidates`,
+                capped at MAX_EF_SEARCH)
+
+        Returns:
+            NodeWithScore list ordered by exact cosine similarity
+        """
+        if not self.ensure_index():
+            return []
+
+        candidates = min(candidates or max(top_k * self.candidate_factor, self.min_candidates), MAX_EF_SEARCH)
+        ef_search = min(max(ef_search or self.hnsw_params["hnsw_ef_search"], candidates), MAX_EF_SEARCH)
+        dim = self.dimension
+
+        sql = text(
+            f"SELECT node_id, text, metadata_, "
+            f"embedding <=> CAST(:query AS vector({dim})) AS distance "
+            f"FROM (SELECT node_id, text, metadata_, embedding FROM {self.table} "
+            f"ORDER BY {self._order_expression()} LIMIT :candidates) AS candidates "
+            f"ORDER BY distance LIMIT :top_k"
+        )
+
+        with self.engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+            rows = conn.execute(sql, {
+                "query": vector_literal(query_embedding),
+                "candidates": candidates,
+                "top_k": top_k
+            }).all()
+
+        results = []
+        for row in rows:
+            try:
+                node = metadata_dict_to_node(row.metadata_)
+                node.set_content(str(row.text))
+            except Exception:
+                node = TextNode(id_=row.node_id, text=row.text, metadata=row.metadata_ or {})
+            results.append(NodeWithScore(node=node, score=1 - row.distance))
+
+        return results
+
+    def index_size(self) -> int:
+        """On-disk size of the quantized index in bytes (0 if missing)."""
+        with self.engine.connect() as conn:
+            size = conn.execute(
+                text("SELECT pg_relation_size(to_regclass(:name))"),
+                {"name": self.index_name}
+            ).scalar()
+        return int(size or 0)
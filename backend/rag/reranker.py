@@ -0,0 +1,172 @@
+"""Local cross-encoder re-ranking of retrieved chunks - no LLM calls."""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class CrossEncoderReranker:
+    """Re-score vector search candidates with a small local cross-encoder.
+
+    Candidates are scored in batches, best vector matches first. Batches are
+    sized from the measured cost per pair so they fit in what is left of
+    the latency budget (at least one pair is always scored); candidates
+    that do not fit keep their vector order behind the scored ones. Scores
+    are cached per (query, chunk text) in a bounded LRU, so repeated or
+    paginated queries cost nothing extra.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        candidates: int = 30,
+        batch_size: int = 16,
+        budget_ms: float = 200.0,
+        cache_size: int = 4096,
+        device: str = "cpu"
+    ):
+        self.model_name = model_name
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self.device = device
+
+        self._model = None
+        # Moving average of predict() time per (query, text) pair
+        self._pair_ms = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["CrossEncoderReranker"]:
+        """Build a reranker if RERANK_ENABLED=true."""
+        if os.getenv("RERANK_ENABLED", "false").lower() != "true":
+            return None
+
+        reranker = cls(
+            model_name=os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+            candidates=int(os.getenv("RERANK_CANDIDATES", "30")),
+            batch_size=int(os.getenv("RERANK_BATCH_SIZE", "16")),
+            budget_ms=float(os.getenv("RERANK_BUDGET_MS", "200")),
+            cache_size=int(os.getenv("RERANK_CACHE_SIZE", "4096")),
+            device=os.getenv("EMBEDDING_DEVICE", "cpu")
+        )
+        # Load and time the model now rather than during the first search
+        reranker.load()
+        return reranker
+
+    @property
+    def model(self):
+        """Cross-encoder (loaded on first use if load() was not called)."""
+        if self._model is None:
+            self.load()
+        return self._model
+
+    def load(self):
+        """Load the cross-encoder and measure its per-pair cost once."""
+        with self._load_lock:
+            if self._model is not None:
+                return
+
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(self.model_name, device=self.device)
+
+            # First call warms up, the second gives an initial per-pair cost
+            pairs = [("warm up query", "a short passage used to time the cross-encoder")] * self.batch_size
+            model.predict(pairs[:1], show_progress_bar=False)
+            start = time.perf_counter()
+            model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            self._pair_ms = (time.perf_counter() - start) * 1000 / len(pairs)
+
+            self._model = model
+
+    def _observe(self, pairs: int, elapsed_ms: float):
+        """Update the per-pair cost estimate from a scored batch."""
+        cost = elapsed_ms / pairs
+        self._pair_ms = cost if self._pair_ms is None else 0.8 * self._pair_ms + 0.2 * cost
+
+    def num_candidates(self, top_k: int) -> int:
+        """How many vector results to fetch for a final top_k."""
+        return max(self.candidates, top_k)
+
+    @staticmethod
+    def _key(query: str, text: str) -> str:
+        return hashlib.sha1(f"{query}\x00{text}".encode()).hexdigest()
+
+    def _cached(self, key: str) -> Optional[float]:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _store(self, key: str, score: float):
+        with self._lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def rerank(self, query: str, results: List[Dict], top_k: int) -> List[Dict]:
+        """Re-order search results by cross-encoder relevance.
+
+        Args:
+            query: Search query
+            results: KnowledgeRetriever results in vector order
+            top_k: Number of results to return
+
+        Returns:
+            Top results with an added "rerank_score" (None if the budget
+            ran out before they were scored)
+        """
+        start = time.perf_counter()
+        keys = [self._key(query, result["text"]) for result in results]
+        scores = [self._cached(key) for key in keys]
+
+        pending = [i for i, score in enumerate(scores) if score is None]
+        model = self.model
+        scored_any = False
+        while pending:
+            # Only as many pairs as the remaining budget is expected to cover
+            remaining_ms = self.budget_ms - (time.perf_counter() - start) * 1000
+            size = min(self.batch_size, len(pending))
+            if self._pair_ms:
+                size = min(size, int(remaining_ms / self._pair_ms))
+            # Every call scores at least one pair, so a stale estimate (one
+            # slow batch under CPU contention) keeps being corrected
+            if not scored_any:
+                size = max(size, 1)
+            elif size < 1 or remaining_ms <= 0:
+                break
+
+            batch, pending = pending[:size], pending[size:]
+            batch_start = time.perf_counter()
+            predicted = model.predict(
+                [(query, results[i]["text"]) for i in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            self._observe(len(batch), (time.perf_counter() - batch_start) * 1000)
+            scored_any = True
+            for i, score in zip(batch, predicted):
+                scores[i] = float(score)
+                self._store(keys[i], scores[i])
+
+        scored = sorted(
+            (i for i, score in enumerate(scores) if score is not None),
+            key=lambda i: scores[i],
+            reverse=True
+        )
+        unscored = [i for i, score in enumerate(scores) if score is None]
+
+        reranked = []
+        for i in (scored + unscored)[:top_k]:
+            result = dict(results[i])
+            result["rerank_score"] = round(scores[i], 4) if scores[i] is not None else None
+            reranked.append(result)
+
+        return reranked
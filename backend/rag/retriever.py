@@ -1,43 +1,78 @@
 """Hybrid search retrieval - no LLM calls."""
 from typing import List, Dict
-from llama_index.core import VectorStoreIndex
+from llama_index.core import Settings, VectorStoreIndex
 from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core.schema import QueryBundle
+
+from metrics import stage
 
 
 class KnowledgeRetriever:
     """Retrieve relevant documents using hybrid search."""
 
-    def __init__(self, index: VectorStoreIndex):
+    def __init__(self, index: VectorStoreIndex, quantized_index=None, embed_model=None, reranker=None, ef_search: int = None):
         self.index = index
-        self.retriever = VectorIndexRetriever(
-            index=index,
-            similarity_top_k=10  # Return top 10 most relevant chunks
+        # QuantizedVectorIndex when VECTOR_STORAGE is halfvec/binary
+        self.quantized_index = quantized_index
+        self.embed_model = embed_model or Settings.embed_model
+        # CrossEncoderReranker when RERANK_ENABLED=true
+        self.reranker = reranker
+        # HNSW search breadth override (default: HNSW_EF_SEARCH)
+        self.ef_search = ef_search
+        self.retriever = self._make_retriever(10)  # Return top 10 most relevant chunks
+
+    def _make_retriever(self, top_k: int) -> VectorIndexRetriever:
+        kwargs = {"hnsw_ef_search": self.ef_search} if self.ef_search else {}
+        return VectorIndexRetriever(
+            index=self.index,
+            similarity_top_k=top_k,
+            vector_store_kwargs=kwargs
         )
 
-    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+    def search(self, query: str, top_k: int = 5, rerank: bool = None) -> List[Dict]:
         """Search knowledge base.
 
         Args:
             query: Search query
             top_k: Number of results to return
+            rerank: Re-rank with the cross-encoder (default: when configured)
 
         Returns:
-            List of dicts with text, metadata, score
+            List of dicts with text, metadata, score (and rerank_score)
         """
-        # Update retriever top_k if different
-        if top_k != self.retriever.similarity_top_k:
-            self.retriever = VectorIndexRetriever(
-                index=self.index,
-                similarity_top_k=top_k
-            )
+        if self.reranker is None or rerank is False:
+            return self._vector_search(query, top_k)
+
+        # Over-fetch, then keep the cross-encoder's top_k
+        candidates = self._vector_search(query, self.reranker.num_candidates(top_k))
+        with stage("retrieval.rerank"):
+            return self.reranker.rerank(query, candidates, top_k)
 
-        # Retrieve nodes (NO LLM calls - just vector similarity)
-        nodes = self.retriever.retrieve(query)
+    def _vector_search(self, query: str, top_k: int) -> List[Dict]:
+        """Vector similarity search, results in similarity order."""
+        # Embed once up front so embedding and DB time are measured separately
+        with stage("retrieval.embed_query"):
+            query_embedding = self.embed_model.get_query_embedding(query)
+
+        if self.quantized_index is not None:
+            # Compact ANN index + exact re-rank on full-precision vectors
+            with stage("retrieval.db_search"):
+                nodes = self.quantized_index.query(query_embedding, top_k, ef_search=self.ef_search)
+        else:
+            # Update retriever top_k if different (local copy: searches may run concurrently)
+            retriever = self.retriever
+            if top_k != retriever.similarity_top_k:
+                retriever = self.retriever = self._make_retriever(top_k)
+
+            # Retrieve nodes (NO LLM calls - just vector similarity)
+            with stage("retrieval.db_search"):
+                nodes = retriever.retrieve(QueryBundle(query_str=query, embedding=query_embedding))
 
         # Format results
         results = []
         for node in nodes:
             results.append({
+                "node_id": node.node.node_id,
                 "text": node.node.get_content(),
                 "score": node.score,
                 "metadata": {
@@ -49,23 +84,26 @@ class KnowledgeRetriever:
 
         return results
 
-    def search_with_context(self, query: str, top_k: int = 5) -> Dict:
+    def search_with_context(self, query: str, top_k: int = 5, rerank: bool = None) -> Dict:
         """Search and return formatted context for Claude.ai.
 
         Returns:
             Dict with query, results, and citation-ready format
         """
-        results = self.search(query, top_k)
+        results = self.search(query, top_k, rerank=rerank)
 
         # Format for Claude.ai consumption
         context_blocks = []
-        for i, result in enumerate(results, 1):
-            context_blocks.append({
-                "chunk_id": i,
-                "text": result["text"],
-                "source": f"{result['metadata']['file_name']}, p. {result['metadata']['page']}",
-                "relevance_score": round(result["score"], 3)
-            })
+        with stage("retrieval.format"):
+            for i, result in enumerate(results, 1):
+                context_blocks.append({
+                    "chunk_id": i,
+                    "text": result["text"],
+                    "source": f"{result['metadata']['file_name']}, p. {result['metadata']['page']}",
+                    "relevance_score": round(result["score"], 3)
+                })
+                if "rerank_score" in result:
+                    context_blocks[-1]["rerank_score"] = result["rerank_score"]
 
         return {
             "query": query,
@@ -0,0 +1,313 @@
+"""Filesystem watcher that keeps the index in sync with the documents directory."""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from .indexer import is_document
+
+# watchdog uses inotify on Linux (FSEvents on macOS); fall back to polling without it
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+# Times a path from a failed flush is queued again before it is dropped
+MAX_RETRIES = 3
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Translate watchdog events into watcher notifications."""
+
+    def __init__(self, watcher: "DocumentWatcher"):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path, UPSERT)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path, UPSERT)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path, DELETE)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path, DELETE)
+            self.watcher.notify(event.dest_path, UPSERT)
+
+
+class DocumentWatcher:
+    """Watch a documents directory and incrementally index changes.
+
+    Events are debounced per file (a file is only indexed once it has been
+    quiet for `debounce` seconds) and flushed in rate-limited batches, so a
+    bulk copy of hundreds of files turns into a handful of index calls.
+    """
+
+    def __init__(
+        self,
+        indexer,
+        documents_dir: str,
+        on_change: Optional[Callable[[Dict], None]] = None,
+        backend: str = "auto",
+        debounce: float = 2.0,
+        poll_interval: float = 5.0,
+        max_batch: int = 50,
+        min_batch_interval: float = 10.0
+    ):
+        """
+        Args:
+            indexer: DocumentIndexer used to index and remove files
+            documents_dir: Directory to watch (recursively)
+            on_change: Called with the batch result after each flush
+            backend: "auto", "inotify" or "polling"
+            debounce: Quiet period (seconds) before a changed file is indexed
+            poll_interval: Scan interval (seconds) for the polling backend
+            max_batch: Maximum files processed per flush
+            min_batch_interval: Minimum seconds between two flushes
+        """
+        self.indexer = indexer
+        self.documents_dir = Path(documents_dir).resolve()
+        self.on_change = on_change
+        self.backend = backend
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
+        self.min_batch_interval = min_batch_interval
+
+        # path -> (action, time of last event)
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+        self._last_flush = 0.0
+        # path -> times re-queued after a failed flush
+        self._retries: Dict[str, int] = {}
+
+        self.stats = {"batches": 0, "indexed": 0, "removed": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls, indexer, documents_dir: str, on_change=None) -> "DocumentWatcher":
+        """Build a watcher configured from WATCH_* environment variables."""
+        return cls(
+            indexer,
+            documents_dir,
+            on_change=on_change,
+            backend=os.getenv("WATCH_BACKEND", "auto"),
+            debounce=float(os.getenv("WATCH_DEBOUNCE_SECONDS", "2.0")),
+            poll_interval=float(os.getenv("WATCH_POLL_INTERVAL", "5.0")),
+            max_batch=int(os.getenv("WATCH_MAX_BATCH", "50")),
+            min_batch_interval=float(os.getenv("WATCH_MIN_BATCH_INTERVAL", "10.0"))
+        )
+
+    @property
+    def active_backend(self) -> str:
+        """Backend actually in use ("inotify" or "polling")."""
+        return "inotify" if self._observer is not None else "polling"
+
+    def start(self):
+        """Start watching in background threads."""
+        self.documents_dir.mkdir(parents=True, exist_ok=True)
+
+        use_inotify = self.backend in ("auto", "inotify") and Observer is not None
+        if self.backend == "inotify" and Observer is None:
+            print("Warning: watchdog not installed, falling back to polling watcher", file=sys.stderr)
+
+        if use_inotify:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_EventHandler(self), str(self.documents_dir), recursive=True)
+                self._observer.start()
+            except OSError as e:
+                # e.g. inotify watch limit reached
+                print(f"Warning: inotify watcher failed ({e}), falling back to polling", file=sys.stderr)
+                self._observer = None
+
+        if self._observer is None:
+            self._start_thread(self._poll_loop)
+
+        self._start_thread(self._flush_loop)
+        self._reconcile()
+
+    def stop(self):
+        """Stop watching and wait for background threads."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+        for thread in self._threads:
+            thread.join()
+
+    def notify(self, path: str, action: str):
+        """Record a filesystem change for a path."""
+        if not is_document(path):
+            return
+
+        with self._cond:
+            self._pending[str(Path(path).resolve())] = (action, time.monotonic())
+            self._cond.notify()
+
+    def _reconcile(self):
+        """Queue changes made while the server was not running.
+
+        Documents whose mtime or size differs from the catalog (or that are
+        missing from it or from the phrase index) are queued as upserts, to
+        be confirmed by content hash; cataloged files that have disappeared
+        are queued as deletes.
+        """
+        current = self._snapshot()
+        cataloged = self.indexer.catalog.file_stats()
+        phrases = self.indexer.phrases
+
+        for path, signature in current.items():
+            if cataloged.get(path) != signature or (phrases is not None and path not in phrases.file_phrases):
+                self.notify(path, UPSERT)
+
+        for path in cataloged.keys() - current.keys():
+            self.notify(path, DELETE)
+
+    def _start_thread(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Map each document path to (mtime_ns, size)."""
+        snapshot = {}
+        for root, _, files in os.walk(self.documents_dir):
+            for name in files:
+                path = str(Path(root, name).resolve())
+                if not is_document(path):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll_loop(self):
+        """Polling fallback: diff directory snapshots."""
+        previous = self._snapshot()
+
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+
+            for path, signature in current.items():
+                if previous.get(path) != signature:
+                    self.notify(path, UPSERT)
+
+            for path in previous.keys() - current.keys():
+                self.notify(path, DELETE)
+
+            previous = current
+
+    def _take_ready(self) -> Dict[str, str]:
+        """Pop up to max_batch settled paths (caller holds the lock)."""
+        cutoff = time.monotonic() - self.debounce
+        settled = sorted(
+            (ts, path) for path, (_, ts) in self._pending.items() if ts <= cutoff
+        )[:self.max_batch]
+
+        return {path: self._pending.pop(path)[0] for _, path in settled}
+
+    def _requeue(self, paths, action: str):
+        """Queue paths of a failed flush again, unless a newer event replaced them."""
+        with self._cond:
+            for path in paths:
+                if path in self._pending:
+                    continue
+                retries = self._retries.get(path, 0) + 1
+                if retries > MAX_RETRIES:
+                    print(f"Watcher giving up on {path} after {MAX_RETRIES} retries", file=sys.stderr)
+                    self._retries.pop(path, None)
+                    continue
+                self._retries[path] = retries
+                self._pending[path] = (action, time.monotonic())
+            self._cond.notify()
+
+    def _clear_retries(self, paths):
+        with self._cond:
+            for path in paths:
+                self._retries.pop(path, None)
+
+    def _flush_loop(self):
+        """Flush settled changes in rate-limited batches."""
+        while not self._stop.is_set():
+            with self._cond:
+                wait = max(self.debounce, self.min_batch_interval - (time.monotonic() - self._last_flush))
+                self._cond.wait(timeout=wait if self._pending else None)
+
+                if self._stop.is_set():
+                    return
+                if time.monotonic() - self._last_flush < self.min_batch_interval:
+                    continue
+
+                batch = self._take_ready()
+
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: Dict[str, str]):
+        """Index upserts and drop deletions for one batch.
+
+        Upserts and deletes fail independently; the paths of a failed part
+        are queued again (up to MAX_RETRIES times) instead of being lost.
+        """
+        self._last_flush = time.monotonic()
+
+        upserts = [path for path, action in batch.items() if action == UPSERT and os.path.exists(path)]
+        deletes = [path for path in batch if path not in upserts]
+
+        result = {"indexed": 0, "removed": 0, "files": [], "failed": []}
+        failed = False
+
+        if upserts:
+            try:
+                indexed = self.indexer.index_files(upserts)
+                result["indexed"] = indexed["indexed"]
+                result["files"] = indexed["files"]
+                result["failed"] = indexed["failed"]
+                self._clear_retries(upserts)
+            except Exception as e:
+                failed = True
+                print(f"Watcher indexing error: {e}", file=sys.stderr)
+                self._requeue(upserts, UPSERT)
+
+        if deletes:
+            try:
+                self.indexer.remove_documents(deletes)
+                result["removed"] = len(deletes)
+                self._clear_retries(deletes)
+            except Exception as e:
+                failed = True
+                print(f"Watcher removal error: {e}", file=sys.stderr)
+                self._requeue(deletes, DELETE)
+
+        if failed:
+            self.stats["errors"] += 1
+            if not result["indexed"] and not result["removed"]:
+                return
+
+        self.stats["batches"] += 1
+        self.stats["indexed"] += result["indexed"]
+        self.stats["removed"] += result["removed"]
+
+        if self.on_change is not None:
+            self.on_change(result)
@@ -0,0 +1,261 @@
+"""Response encoding for MCP tool outputs, including a compact budgeted mode."""
+import json
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+# Rough size of a token in bytes of English JSON text
+BYTES_PER_TOKEN = 4
+
+# Room left for the bytes / bytes_saved fields added after fitting
+SAVINGS_RESERVE = 48
+
+# Smallest excerpt worth sending; hits that cannot get this much are dropped
+MIN_EXCERPT_CHARS = 80
+
+# Web titles/URLs are cut to this when sending them whole would leave no hits
+MAX_FIELD_CHARS = 60
+
+STOP_WORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "how",
+    "what", "when", "where", "which", "who", "why", "with", "from", "that", "this",
+    "does", "into", "about", "your", "have", "has", "was", "were", "will",
+}
+
+
+def encode_response(result: Dict) -> str:
+    """Default (full) encoding used by every tool."""
+    return json.dumps(result, indent=2)
+
+
+def encode_compact(result: Dict) -> str:
+    """Whitespace-free JSON."""
+    return json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+
+
+def query_terms(query: str) -> List[str]:
+    """Words of a query worth locating in a chunk."""
+    words = re.findall(r"\w+", query.lower())
+    return [w for w in words if len(w) > 2 and w not in STOP_WORDS]
+
+
+def excerpt(text: str, terms: List[str], max_chars: int) -> str:
+    """Cut `text` to at most `max_chars`, keeping the densest run of query terms.
+
+    Cuts are snapped to word boundaries and marked with an ellipsis.
+    """
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 2:
+        return ""
+
+    width = max_chars - 2  # room for leading/trailing ellipsis
+    lower = text.lower()
+    positions = sorted(m.start() for term in terms for m in re.finditer(re.escape(term), lower))
+
+    start = 0
+    if positions:
+        # Window start that covers the most term occurrences
+        best = 0
+        for pos in positions:
+            candidate = max(pos - width // 4, 0)
+            count = bisect_left(positions, candidate + width) - bisect_left(positions, candidate)
+            if count > best:
+                best, start = count, candidate
+
+    start = min(start, len(text) - width)
+    end = start + width
+
+    if start > 0:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < end else start
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+
+    return ("…" if start > 0 else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+def clip(text: str, max_chars: Optional[int]) -> str:
+    """Cut `text` to at most `max_chars` (None = no limit), marking the cut with an ellipsis."""
+    if max_chars is None or len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 1, 0)].rstrip() + "…"
+
+
+def budget_bytes(max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> Optional[int]:
+    """Byte budget from a token and/or byte limit (the tighter one wins)."""
+    limits = []
+    if max_tokens:
+        limits.append(int(max_tokens) * BYTES_PER_TOKEN)
+    if max_bytes:
+        limits.append(int(max_bytes))
+    return min(limits) if limits else None
+
+
+def _fit(build, texts: List[str], terms: List[str], budget: Optional[int]) -> Dict:
+    """Shrink per-hit excerpts (dropping the weakest hits) until `build` fits.
+
+    `build(excerpts)` returns the response for the given excerpt texts,
+    where excerpts[i] is None for a dropped hit; texts are in rank order.
+    """
+    if budget is None or not texts:
+        return build([" ".join(t.split()) for t in texts])
+
+    budget -= SAVINGS_RESERVE
+    keep = len(texts)
+    while keep > 0:
+        skeleton = len(encode_compact(build([""] * keep + [None] * (len(texts) - keep))).encode())
+        allowance = (budget - skeleton) // keep
+        # The top hit is kept with a shorter excerpt as long as any text fits
+        if allowance >= MIN_EXCERPT_CHARS or (keep == 1 and allowance > 0):
+            break
+        keep -= 1
+
+    # Water-fill: short texts donate their unused share to longer ones
+    lengths = [len(" ".join(t.split())) for t in texts[:keep]]
+    remaining = max(budget - skeleton, 0)
+    limits = [0] * keep
+    open_hits = list(range(keep))
+    while open_hits and remaining > 0:
+        share = remaining // len(open_hits)
+        if share == 0:
+            break
+        still_open = []
+        for i in open_hits:
+            grant = min(share, lengths[i] - limits[i])
+            limits[i] += grant
+            remaining -= grant
+            if limits[i] < lengths[i]:
+                still_open.append(i)
+        open_hits = still_open
+
+    # JSON escaping and multi-byte characters can overshoot; tighten until it fits
+    while True:
+        excerpts = [excerpt(t, terms, limit) for t, limit in zip(texts, limits)]
+        response = build(excerpts + [None] * (len(texts) - keep))
+        size = len(encode_compact(response).encode())
+        if size <= budget or not any(limits):
+            return _shrink_fields(response, budget)
+        limits = [int(limit * 0.9) for limit in limits]
+
+
+def _shrink_fields(response: Dict, budget: int) -> Dict:
+    """Cut the longest string fields, then drop empty ones, until `response` fits.
+
+    Only reached when even the hit-less skeleton (query, citation format,
+    ...) is over budget.
+    """
+    while len(encode_compact(response).encode()) > budget:
+        overflow = len(encode_compact(response).encode()) - budget
+        strings = [key for key, value in response.items() if isinstance(value, str) and value]
+        if strings:
+            key = max(strings, key=lambda k: len(response[k]))
+            kept = response[key][:max(len(response[key]) - overflow - 3, 0)].rstrip()
+            response[key] = kept + "…" if kept else ""
+            continue
+
+        empty = [key for key, value in response.items() if value in ("", [], {})]
+        if not empty:
+            break
+        for key in empty:
+            del response[key]
+
+    return response
+
+
+def compact_knowledge_results(
+    result: Dict,
+    max_tokens: Optional[int] = None,
+    max_bytes: Optional[int] = None
+) -> Dict:
+    """Compact form of KnowledgeRetriever.search_with_context output.
+
+    Hits are grouped by file (the file name is sent once), chunk text is
+    trimmed around the query terms to fit the budget, and the lowest ranked
+    hits are dropped if the budget cannot hold them all.
+    """
+    hits = result.get("results", [])
+    terms = query_terms(result.get("query", ""))
+    budget = budget_bytes(max_tokens, max_bytes)
+
+    def build(excerpts):
+        sources = {}
+        for hit, text in zip(hits, excerpts):
+            if text is None:
+                continue
+            file_name, _, page = hit["source"].rpartition(", p. ")
+            entry = {"page": page, "score": hit["relevance_score"], "text": text}
+            if hit.get("rerank_score") is not None:
+                entry["rerank"] = hit["rerank_score"]
+            sources.setdefault(file_name, []).append(entry)
+
+        return {
+            "query": result.get("query", ""),
+            "num_results": sum(len(v) for v in sources.values()),
+            "sources": [{"file": name, "hits": entries} for name, entries in sources.items()],
+            "citation_format": result.get("citation_format", "")
+        }
+
+    response = _fit(build, [hit["text"] for hit in hits], terms, budget)
+    return _with_savings(result, response)
+
+
+def compact_web_results(
+    result: Dict,
+    max_tokens: Optional[int] = None,
+    max_bytes: Optional[int] = None
+) -> Dict:
+    """Compact form of WebSearcher.search_with_context output, grouped by site.
+
+    Titles and URLs are sent whole unless that leaves no room for any hit;
+    then they are cut to MAX_FIELD_CHARS as well.
+    """
+    hits = result.get("results", [])
+    terms = query_terms(result.get("query", ""))
+    budget = budget_bytes(max_tokens, max_bytes)
+
+    def builder(field_chars):
+        def build(excerpts):
+            sites = {}
+            for hit, text in zip(hits, excerpts):
+                if text is None:
+                    continue
+                domain = urlparse(hit.get("url", "")).netloc or "unknown"
+                sites.setdefault(domain, []).append({
+                    "title": clip(hit.get("title", ""), field_chars),
+                    "url": clip(hit.get("url", ""), field_chars),
+                    "text": text
+                })
+
+            return {
+                "query": result.get("query", ""),
+                "num_results": sum(len(v) for v in sites.values()),
+                "provider": hits[0].get("source", "") if hits else "",
+                "sites": [{"domain": domain, "hits": entries} for domain, entries in sites.items()],
+                "citation_format": result.get("citation_format", "")
+            }
+        return build
+
+    texts = [hit.get("snippet", "") for hit in hits]
+    response = _fit(builder(None), texts, terms, budget)
+    if hits and not response["num_results"]:
+        response = _fit(builder(MAX_FIELD_CHARS), texts, terms, budget)
+    return _with_savings(result, response)
+
+
+def _with_savings(full: Dict, response: Dict) -> Dict:
+    """Record the compact size and how much it saved over the full encoding."""
+    full_bytes = len(encode_response(full).encode())
+    response["bytes"] = 0
+    response["bytes_saved"] = 0
+
+    # Two passes so the reported numbers account for their own digits
+    for _ in range(2):
+        size = len(encode_compact(response).encode())
+        response["bytes"] = size
+        response["bytes_saved"] = max(full_bytes - size, 0)
+
+    return response
@@ -1,24 +1,34 @@
 """SEO analysis and content optimization tools."""
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from keybert import KeyBERT
-import spacy
 from collections import Counter
 import re
+import sys
+
+from metrics import stage
+from rag.batching import MicroBatcher
+from seo.nlp import LONG_SENTENCE_WORDS, ContentPipeline
+
+# Readability targets for analyze_content_seo
+MIN_READING_EASE = 50
+MAX_AVG_SENTENCE_LENGTH = 20
 
 
 class SEOAnalyzer:
     """SEO tools for content optimization."""
 
-    def __init__(self):
+    def __init__(self, phrase_index=None):
+        # Corpus phrase index (rag.phrases.PhraseIndex) for related keywords
+        self.phrase_index = phrase_index
+
         # Initialize KeyBERT for keyword extraction
         self.kw_model = KeyBERT()
+        # Concurrent extract_keywords calls share one KeyBERT pass (MICRO_BATCHING)
+        self.keyword_batcher = MicroBatcher.from_env(self._extract_keyword_batch, "keywords")
 
-        # Try to load spaCy model (if not available, fall back to basic)
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            self.nlp = None
-            print("Warning: spaCy model not loaded. Run: python -m spacy download en_core_web_sm")
+        # Batched spaCy analysis (falls back to regex sentence splitting without the model)
+        self.pipeline = ContentPipeline.from_env()
+        self.nlp = self.pipeline.nlp
 
     def extract_keywords(self, text: str, top_n: int = 10) -> List[Dict[str, float]]:
         """Extract SEO keywords from text.
@@ -30,20 +40,60 @@ class SEOAnalyzer:
         Returns:
             List of {keyword, score} dicts
         """
+        if not text.strip():
+            return []
+
         try:
-            keywords = self.kw_model.extract_keywords(
-                text,
-                keyphrase_ngram_range=(1, 3),
-                stop_words='english',
-                top_n=top_n,
-                use_maxsum=True
-            )
+            with stage("seo.keybert"):
+                if self.keyword_batcher is not None:
+                    keywords = self.keyword_batcher.submit((text, top_n))
+                else:
+                    keywords = self._keybert(text, top_n)
 
             return [{"keyword": kw, "score": round(score, 3)} for kw, score in keywords]
         except Exception as e:
-            print(f"Keyword extraction error: {e}")
+            print(f"Keyword extraction error: {e}", file=sys.stderr)
             return []
 
+    def _keybert(self, docs, top_n: int):
+        return self.kw_model.extract_keywords(
+            docs,
+            keyphrase_ngram_range=(1, 3),
+            stop_words='english',
+            top_n=top_n,
+            use_maxsum=True
+        )
+
+    def _extract_keyword_batch(self, requests: List[Tuple[str, int]]) -> List[List]:
+        """KeyBERT over many (text, top_n) requests, one call per distinct top_n."""
+        results = [None] * len(requests)
+        by_top_n = {}
+        for i, (_, top_n) in enumerate(requests):
+            by_top_n.setdefault(top_n, []).append(i)
+
+        for top_n, indexes in by_top_n.items():
+            docs = [requests[i][0] for i in indexes]
+            if len(docs) == 1:
+                # KeyBERT unwraps single-document results
+                results[indexes[0]] = self._keybert(docs[0], top_n)
+                continue
+
+            try:
+                keywords = self._keybert(docs, top_n)
+            except ValueError:
+                # e.g. no usable vocabulary: don't fail the whole batch for one text
+                keywords = []
+                for doc in docs:
+                    try:
+                        keywords.append(self._keybert(doc, top_n))
+                    except ValueError:
+                        keywords.append([])
+
+            for i, doc_keywords in zip(indexes, keywords):
+                results[i] = doc_keywords
+
+        return results
+
     def generate_seo_outline(self, topic: str, target_keywords: List[str] = None) -> Dict:
         """Generate SEO-optimized content outline.
 
@@ -107,6 +157,7 @@ class SEOAnalyzer:
                     ]
                 }
             ],
+            "semantic_keywords": self._generate_semantic_keywords(topic),
             "seo_checklist": [
                 "Include target keyword in title, H1, H2s",
                 "Keep title under 60 characters",
@@ -174,7 +225,7 @@ class SEOAnalyzer:
                     "answer_format": "Specific, actionable answer"
                 }
             ],
-            "semantic_keywords": self._generate_semantic_keywords(topic),
+            "semantic_keywords": self._generate_semantic_keywords(topic, content_context),
             "optimization_tips": [
                 "Use natural language (how people speak)",
                 "Answer questions directly in first paragraph",
@@ -186,9 +237,12 @@ class SEOAnalyzer:
 
         return snippets
 
-    def _generate_semantic_keywords(self, topic: str) -> List[str]:
-        """Generate LSI/semantic keywords related to topic."""
-        # This is a simplified version - in production, use word2vec or BERT
+    def _generate_semantic_keywords(self, topic: str, context: str = "") -> List[str]:
+        """Generate LSI/semantic keywords related to topic.
+
+        Related phrases from the indexed corpus come first, then entities and
+        noun phrases from the context, then the topic's search-style variations.
+        """
         base_variations = [
             topic.lower(),
             f"{topic.lower()} guide",
@@ -199,7 +253,16 @@ class SEOAnalyzer:
             f"{topic.lower()} for beginners"
         ]
 
-        return base_variations
+        corpus_keywords = []
+        if self.phrase_index is not None:
+            try:
+                with stage("seo.phrases"):
+                    corpus_keywords = [r["phrase"] for r in self.phrase_index.related(topic, top_k=10)]
+            except Exception as e:
+                print(f"Phrase lookup error: {e}", file=sys.stderr)
+
+        context_keywords = self.pipeline.analyze(context)["semantic_keywords"] if context.strip() else []
+        return list(dict.fromkeys(corpus_keywords + context_keywords + base_variations))
 
     def analyze_content_seo(self, content: str, target_keyword: str) -> Dict:
         """Analyze content for SEO quality.
@@ -211,6 +274,22 @@ class SEOAnalyzer:
         Returns:
             Dict with SEO analysis and scores
         """
+        return self.analyze_content_batch([content], target_keyword)[0]
+
+    def analyze_content_batch(self, contents: List[str], target_keyword: str) -> List[Dict]:
+        """Analyze several drafts in one spaCy batch (unchanged drafts hit the cache).
+
+        Args:
+            contents: Full content texts
+            target_keyword: Primary keyword to check
+
+        Returns:
+            One analysis dict per content, as analyze_content_seo
+        """
+        nlp_results = self.pipeline.analyze_many(contents)
+        return [self._score_content(content, target_keyword, nlp) for content, nlp in zip(contents, nlp_results)]
+
+    def _score_content(self, content: str, target_keyword: str, nlp: Dict) -> Dict:
         content_lower = content.lower()
         keyword_lower = target_keyword.lower()
 
@@ -228,15 +307,33 @@ class SEOAnalyzer:
         # Check lists
         has_lists = bool(re.search(r'^\d+\.|\*|-', content, re.MULTILINE))
 
+        # Readability: Flesch reading ease and average sentence length
+        reading_ease = nlp["flesch_reading_ease"]
+        readable = (
+            reading_ease is not None
+            and reading_ease >= MIN_READING_EASE
+            and nlp["avg_sentence_length"] <= MAX_AVG_SENTENCE_LENGTH
+        )
+
         analysis = {
             "word_count": word_count,
             "keyword_count": keyword_count,
             "keyword_density": round(keyword_density, 2),
+            "readability": {
+                "sentences": nlp["sentences"],
+                "avg_sentence_length": nlp["avg_sentence_length"],
+                "long_sentence_ratio": nlp["long_sentence_ratio"],
+                "flesch_reading_ease": reading_ease,
+                "flesch_kincaid_grade": nlp["flesch_kincaid_grade"]
+            },
+            "semantic_keywords": nlp["semantic_keywords"],
+            "entities": nlp["entities"],
             "scores": {
                 "length": "PASS" if word_count >= 1500 else "IMPROVE",
                 "keyword_density": "PASS" if 1 <= keyword_density <= 2 else "IMPROVE",
                 "structure": "PASS" if (h1_present and h2_present) else "IMPROVE",
-                "readability": "PASS" if has_lists else "IMPROVE"
+                "readability": "PASS" if readable else "IMPROVE",
+                "lists": "PASS" if has_lists else "IMPROVE"
             },
             "recommendations": []
         }
@@ -253,6 +350,14 @@ class SEOAnalyzer:
         if not h1_present or not h2_present:
             analysis["recommendations"].append("Add proper heading structure (H1, H2s)")
 
+        if nlp["avg_sentence_length"] > MAX_AVG_SENTENCE_LENGTH:
+            analysis["recommendations"].append(
+                f"Shorten sentences (average: {nlp['avg_sentence_length']} words, "
+                f"{nlp['long_sentence_ratio']:.0%} over {LONG_SENTENCE_WORDS} words)"
+            )
+        elif reading_ease is not None and reading_ease < MIN_READING_EASE:
+            analysis["recommendations"].append(f"Use simpler words (Flesch reading ease: {reading_ease})")
+
         if not has_lists:
             analysis["recommendations"].append("Add bulleted or numbered lists for better readability")
 
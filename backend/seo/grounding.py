@@ -0,0 +1,162 @@
+"""Knowledge base evidence for outline sections and AEO questions."""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from metrics import stage
+from responses import excerpt, query_terms
+
+
+def _rank(result: Dict) -> Tuple[int, float]:
+    """Sort key for a hit: cross-encoder scored hits first, by their own scale.
+
+    Rerank logits and cosine similarities are not comparable, and hits the
+    reranker had no budget left for carry rerank_score=None; those rank
+    after every scored hit, by vector similarity.
+    """
+    if result.get("rerank_score") is not None:
+        return 1, float(result["rerank_score"])
+    score = result.get("score")
+    return 0, float(score) if score is not None else float("-inf")
+
+
+class OutlineGrounder:
+    """Attach supporting chunks to every section of an outline in one fan-out.
+
+    All section queries are searched concurrently and the whole fan-out
+    shares a single latency budget: sections whose search has not finished
+    when it runs out get no sources instead of delaying the response. With
+    micro-batching (rag.batching) the concurrent query embeddings also run
+    as one forward pass. A chunk retrieved for several sections is kept
+    only for the section it matches best.
+
+    Each call gets its own thread pool: a search still running when the
+    budget expires cannot be interrupted, so a shared pool would let slow
+    calls starve the next ones.
+    """
+
+    def __init__(self, budget_ms: float = 1000.0, sources_per_section: int = 3, max_workers: int = 8, excerpt_chars: int = 300):
+        self.budget_ms = budget_ms
+        self.sources_per_section = sources_per_section
+        self.max_workers = max_workers
+        self.excerpt_chars = excerpt_chars
+
+    @classmethod
+    def from_env(cls) -> "OutlineGrounder":
+        return cls(
+            budget_ms=float(os.getenv("GROUNDING_BUDGET_MS", "1000")),
+            sources_per_section=int(os.getenv("GROUNDING_SOURCES", "3")),
+            max_workers=int(os.getenv("GROUNDING_MAX_WORKERS", "8"))
+        )
+
+    def ground(self, retriever, queries: List[str], sources_per_section: Optional[int] = None) -> Dict:
+        """Search all queries concurrently and split the hits between them.
+
+        Args:
+            retriever: KnowledgeRetriever (anything with search(query, top_k))
+            queries: One query per section
+            sources_per_section: Override for the number of sources kept
+
+        Returns:
+            dict with "sources" (one list per query, None where the search
+            missed the budget or failed) and "stats"
+        """
+        per_section = sources_per_section or self.sources_per_section
+        started = time.perf_counter()
+
+        if not queries:
+            return {"sources": [], "stats": {"queries": 0, "budget_ms": self.budget_ms}}
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(queries)), thread_name_prefix="grounding")
+        with stage("seo.grounding"):
+            # Over-fetch so sections still have sources after dedup
+            futures = [executor.submit(retriever.search, query, per_section * 2) for query in queries]
+            done, pending = wait(futures, timeout=self.budget_ms / 1000)
+        # Queued searches are dropped; running ones finish on this call's threads
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        hits = []
+        for query, future in zip(queries, futures):
+            if future in done and future.exception() is None:
+                hits.append(future.result())
+                continue
+            if future in done:
+                print(f"Grounding search failed for {query!r}: {future.exception()}", file=sys.stderr)
+            hits.append(None)
+
+        # Each chunk goes to the section it scores best for
+        best = {}
+        for section, results in enumerate(hits):
+            for result in results or []:
+                key = result.get("node_id") or result["text"]
+                rank = _rank(result)
+                if key not in best or rank > best[key][0]:
+                    best[key] = (rank, section, result)
+
+        assigned = [[] for _ in queries]
+        for rank, section, result in best.values():
+            assigned[section].append((rank, result))
+
+        sources = []
+        for section, query in enumerate(queries):
+            if hits[section] is None:
+                sources.append(None)
+                continue
+            ranked = sorted(assigned[section], key=lambda item: item[0], reverse=True)[:per_section]
+            sources.append([self._source(query, result) for _, result in ranked])
+
+        return {
+            "sources": sources,
+            "stats": {
+                "queries": len(queries),
+                "completed": sum(1 for s in sources if s is not None),
+                "timed_out": len(pending),
+                "failed": sum(1 for f in done if f.exception() is not None),
+                "unique_chunks": len(best),
+                "sources": sum(len(s) for s in sources if s),
+                "budget_ms": self.budget_ms,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        }
+
+    def _source(self, query: str, result: Dict) -> Dict:
+        metadata = result.get("metadata", {})
+        score = result.get("score")
+        source = {
+            "file_name": metadata.get("file_name", "unknown"),
+            "page": metadata.get("page", "N/A"),
+            "score": round(float(score), 4) if score is not None else None,
+            "excerpt": excerpt(result["text"], query_terms(query), self.excerpt_chars)
+        }
+        if result.get("rerank_score") is not None:
+            source["rerank_score"] = round(float(result["rerank_score"]), 4)
+        return source
+
+    def ground_outline(self, retriever, outline: Dict, topic: str, sources_per_section: Optional[int] = None) -> Dict:
+        """Add "sources" to each H2 of a generate_seo_outline result."""
+        sections = [item for item in outline["structure"] if item["type"] == "h2" and "keywords" in item]
+        queries = [s["text"] if topic.lower() in s["text"].lower() else f"{s['text']} {topic}" for s in sections]
+
+        grounding = self.ground(retriever, queries, sources_per_section)
+        for section, sources in zip(sections, grounding["sources"]):
+            section["sources"] = sources or []
+            if sources is None:
+                section["evidence"] = "unavailable"
+
+        outline["grounding"] = grounding["stats"]
+        return outline
+
+    def ground_snippets(self, retriever, snippets: Dict, sources_per_section: Optional[int] = None) -> Dict:
+        """Add "sources" to each question of a generate_aeo_snippets result."""
+        questions = snippets["featured_snippet_qa"] + snippets["voice_search_qa"]
+
+        grounding = self.ground(retriever, [q["question"] for q in questions], sources_per_section)
+        for question, sources in zip(questions, grounding["sources"]):
+            question["sources"] = sources or []
+            if sources is None:
+                question["evidence"] = "unavailable"
+
+        snippets["grounding"] = grounding["stats"]
+        return snippets
@@ -0,0 +1,209 @@
+"""Batched spaCy analysis of drafts: sentences, readability and semantic keywords."""
+import hashlib
+import os
+import re
+import sys
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+from metrics import stage
+from rag.phrases import normalize_noun_chunk
+
+# Entity types worth suggesting as keywords (no dates, numbers, amounts)
+KEYWORD_ENTITY_LABELS = {
+    "PERSON", "NORP", "FAC", "ORG", "GPE", "LOC", "PRODUCT",
+    "EVENT", "WORK_OF_ART", "LAW", "LANGUAGE",
+}
+LONG_SENTENCE_WORDS = 25
+
+
+def count_syllables(word: str) -> int:
+    """Vowel-group estimate, good enough for readability formulas."""
+    word = word.lower()
+    groups = len(re.findall(r"[aeiouy]+", word))
+    if word.endswith("e") and not word.endswith(("le", "ee")) and groups > 1:
+        groups -= 1
+    return max(groups, 1)
+
+
+def plain_text(content: str) -> str:
+    """Markdown to prose: drop code blocks, end headings and list items as sentences."""
+    content = re.sub(r"```.*?```", " ", content, flags=re.DOTALL)
+    lines = []
+    for line in content.splitlines():
+        line = re.sub(r"^\s*(#+|[-*+]|\d+[.)])\s+", "", line).strip()
+        if line:
+            lines.append(line if line[-1] in ".!?:;" else line + ".")
+    return "\n".join(lines)
+
+
+def readability(sentence_lengths: List[int], words: List[str]) -> Dict:
+    """Sentence length stats plus Flesch reading ease and Flesch-Kincaid grade."""
+    num_sentences = len(sentence_lengths)
+    num_words = len(words)
+    if not num_sentences or not num_words:
+        return {
+            "sentences": num_sentences,
+            "avg_sentence_length": 0.0,
+            "long_sentence_ratio": 0.0,
+            "flesch_reading_ease": None,
+            "flesch_kincaid_grade": None,
+        }
+
+    words_per_sentence = num_words / num_sentences
+    syllables_per_word = sum(count_syllables(w) for w in words) / num_words
+    return {
+        "sentences": num_sentences,
+        "avg_sentence_length": round(words_per_sentence, 1),
+        "long_sentence_ratio": round(sum(1 for n in sentence_lengths if n > LONG_SENTENCE_WORDS) / num_sentences, 3),
+        "flesch_reading_ease": round(206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word, 1),
+        "flesch_kincaid_grade": round(0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59, 1),
+    }
+
+
+class ContentPipeline:
+    """spaCy over many texts at once, with results cached per content hash.
+
+    Uncached texts go through `nlp.pipe` in batches (in `n_process` worker
+    processes for large batches), with components the analysis does not use
+    disabled. Without the spaCy model, readability still works from a regex
+    sentence split and keywords come back empty.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "en_core_web_sm",
+        disable: List[str] = None,
+        batch_size: int = 64,
+        n_process: int = 1,
+        cache_size: int = 1024,
+        max_keywords: int = 15
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.cache_size = cache_size
+        self.max_keywords = max_keywords
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._nlp_lock = threading.Lock()
+
+        # Sentences and noun chunks need the parser, entities need ner
+        try:
+            import spacy
+            self.nlp = spacy.load(model_name, disable=disable if disable is not None else ["lemmatizer"])
+        except (ImportError, OSError):
+            self.nlp = None
+            print(f"Warning: spaCy model not loaded. Run: python -m spacy download {model_name}", file=sys.stderr)
+
+    @classmethod
+    def from_env(cls) -> "ContentPipeline":
+        disable = os.getenv("NLP_DISABLE", "lemmatizer")
+        return cls(
+            model_name=os.getenv("SPACY_MODEL", "en_core_web_sm"),
+            disable=[name.strip() for name in disable.split(",") if name.strip()],
+            batch_size=int(os.getenv("NLP_BATCH_SIZE", "64")),
+            n_process=int(os.getenv("NLP_N_PROCESS", "1")),
+            cache_size=int(os.getenv("NLP_CACHE_SIZE", "1024"))
+        )
+
+    def analyze(self, text: str) -> Dict:
+        return self.analyze_many([text])[0]
+
+    def analyze_many(self, texts: List[str]) -> List[Dict]:
+        """Analyze texts in one batch.
+
+        Args:
+            texts: Raw or markdown texts
+
+        Returns:
+            One dict per text with readability stats, entities, noun_phrases
+            and semantic_keywords (shared with the cache: do not modify)
+        """
+        keys = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        results = [self._cached(key) for key in keys]
+
+        # Unique uncached texts, in order
+        pending = {}
+        for key, text, result in zip(keys, texts, results):
+            if result is None and key not in pending:
+                pending[key] = plain_text(text)
+
+        if pending:
+            with stage("seo.nlp"):
+                analyses = self._run(list(pending.values()))
+            for key, analysis in zip(pending, analyses):
+                self._store(key, analysis)
+            fresh = dict(zip(pending, analyses))
+            results = [result if result is not None else fresh[key] for key, result in zip(keys, results)]
+
+        return results
+
+    def _run(self, texts: List[str]) -> List[Dict]:
+        if self.nlp is None:
+            return [self._analyze_plain(text) for text in texts]
+
+        # Worker processes only pay off once there is more than one batch
+        n_process = self.n_process if len(texts) > self.batch_size else 1
+        with self._nlp_lock:
+            docs = list(self.nlp.pipe(texts, batch_size=self.batch_size, n_process=n_process))
+        return [self._analyze_doc(doc) for doc in docs]
+
+    def _analyze_plain(self, text: str) -> Dict:
+        sentences = [s for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
+        lengths = [len(re.findall(r"[A-Za-z]+", s)) for s in sentences]
+        analysis = readability([n for n in lengths if n], re.findall(r"[A-Za-z]+", text))
+        analysis.update({"entities": [], "noun_phrases": [], "semantic_keywords": []})
+        return analysis
+
+    def _analyze_doc(self, doc) -> Dict:
+        words = [token.text for token in doc if token.is_alpha]
+        lengths = [n for n in (sum(1 for token in sent if token.is_alpha) for sent in doc.sents) if n]
+        analysis = readability(lengths, words)
+
+        entities = Counter()
+        labels = {}
+        for ent in doc.ents:
+            if ent.label_ in KEYWORD_ENTITY_LABELS:
+                entities[ent.text] += 1
+                labels[ent.text] = ent.label_
+
+        phrases = Counter()
+        for chunk in doc.noun_chunks:
+            phrase = normalize_noun_chunk(chunk)
+            if phrase:
+                phrases[phrase] += 1
+
+        # Entities first, then the most frequent multi-word and single-word phrases
+        keywords = list(dict.fromkeys(
+            [text.lower() for text, _ in entities.most_common()] +
+            [p for p, _ in phrases.most_common() if " " in p] +
+            [p for p, _ in phrases.most_common()]
+        ))
+
+        analysis.update({
+            "entities": [{"text": text, "label": labels[text], "count": n} for text, n in entities.most_common(self.max_keywords)],
+            "noun_phrases": [{"phrase": p, "count": n} for p, n in phrases.most_common(self.max_keywords)],
+            "semantic_keywords": keywords[:self.max_keywords],
+        })
+        return analysis
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _store(self, key: str, analysis: Dict):
+        with self._cache_lock:
+            self._cache[key] = analysis
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -0,0 +1,61 @@
+"""Cross-request micro-batching."""
+import threading
+
+import pytest
+
+from rag.batching import BatchedQueryEmbedder, MicroBatcher
+
+
+def test_concurrent_submits_share_a_batch():
+    calls = []
+
+    def double(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, window_ms=50, max_batch=8)
+    results = [None] * 8
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.submit(i))) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert results == [i * 2 for i in range(8)]
+    assert len(calls) < 8
+    assert batcher.stats()["requests"] == 8
+
+
+def test_batch_errors_reach_every_caller():
+    def fail(items):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(fail, window_ms=0)
+    with pytest.raises(ValueError):
+        batcher.submit(1)
+    assert batcher.stats()["errors"] == 1
+    batcher.close()
+
+
+def test_submit_after_close_runs_inline():
+    batcher = MicroBatcher(lambda items: [item + 1 for item in items], window_ms=0)
+    batcher.close()
+    batcher.close()
+    assert batcher.submit(9) == 10
+
+
+def test_query_embedder_embeds_duplicates_once():
+    class Model:
+        def __init__(self):
+            self.seen = []
+
+        def get_query_embedding_batch(self, queries):
+            self.seen.extend(queries)
+            return [[float(len(query))] for query in queries]
+
+    model = Model()
+    embedder = BatchedQueryEmbedder(model, window_ms=0)
+    assert embedder._embed_unique(["a", "bb", "a"]) == [[1.0], [2.0], [1.0]]
+    assert model.seen == ["a", "bb"]
+    embedder.close()
@@ -0,0 +1,52 @@
+"""Document catalog pagination and filters (SQLite)."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from rag.catalog import DocumentCatalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = DocumentCatalog(f"sqlite:///{tmp_path / 'catalog.db'}", "test-model")
+    catalog.upsert([
+        {"file_path": f"/docs/file{i:02d}.{'pdf' if i % 2 else 'md'}", "chunk_count": i, "bytes": 100 * i,
+         "content_hash": f"h{i}", "mtime_ns": i}
+        for i in range(25)
+    ])
+    return catalog
+
+
+def test_pages_cover_every_document_once(catalog):
+    seen, cursor = [], None
+    while True:
+        page = catalog.list(limit=10, cursor=cursor)
+        seen.extend(doc["file_path"] for doc in page["documents"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 25
+    assert seen == sorted(set(seen))
+
+
+def test_filters(catalog):
+    assert catalog.list(limit=50, file_type=".PDF")["count"] == 12
+    assert [d["file_name"] for d in catalog.list(name_contains="FILE07")["documents"]] == ["file07.pdf"]
+
+
+def test_indexed_after_accepts_naive_utc(catalog):
+    past = datetime.now(timezone.utc) - timedelta(hours=1)
+    assert catalog.list(limit=50, indexed_after=past.replace(tzinfo=None))["count"] == 25
+    assert catalog.list(limit=50, indexed_after=datetime.now(timezone.utc) + timedelta(hours=1))["count"] == 0
+
+
+def test_models_are_separate(catalog, tmp_path):
+    other = DocumentCatalog(f"sqlite:///{tmp_path / 'catalog.db'}", "other-model")
+    assert other.count() == 0
+    assert catalog.count() == 25
+
+
+def test_touch_updates_file_stats(catalog):
+    catalog.touch([{"file_path": "/docs/file01.pdf", "bytes": 5, "mtime_ns": 99}])
+    assert catalog.file_stats()["/docs/file01.pdf"] == (99, 5)
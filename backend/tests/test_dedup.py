@@ -0,0 +1,48 @@
+"""MinHash near-duplicate chunk detection."""
+from llama_index.core.schema import TextNode
+
+from rag.chunking import ChunkDeduplicator
+
+BOILERPLATE = "Copyright 2024 Example Corp. All rights reserved. Confidential, do not distribute outside the company."
+
+
+def node(text: str, path: str) -> TextNode:
+    return TextNode(text=text, metadata={"file_path": path})
+
+
+def test_near_duplicates_are_dropped_and_recorded_as_dependents():
+    dedup = ChunkDeduplicator()
+    kept = dedup.filter([node(BOILERPLATE, "/a.pdf"), node("Roses need pruning in late winter each year.", "/a.pdf")])
+    assert len(kept) == 2
+
+    kept = dedup.filter([node(BOILERPLATE + " ", "/b.pdf"), node("Tomatoes need full sun and steady watering.", "/b.pdf")])
+    assert [n.get_content() for n in kept] == ["Tomatoes need full sun and steady watering."]
+    assert dedup.dependents_of(["/a.pdf"]) == {"/b.pdf"}
+
+
+def test_distinct_chunks_are_kept():
+    dedup = ChunkDeduplicator()
+    texts = [f"Chapter {i} covers an unrelated topic number {i} with its own words {i * 7}" for i in range(5)]
+    assert len(dedup.filter([node(t, "/a.pdf") for t in texts])) == 5
+
+
+def test_remove_returns_dependents_and_frees_signatures():
+    dedup = ChunkDeduplicator()
+    dedup.filter([node(BOILERPLATE, "/a.pdf")])
+    dedup.filter([node(BOILERPLATE, "/b.pdf")])
+
+    assert dedup.remove(["/a.pdf"]) == {"/b.pdf"}
+    assert "/a.pdf" not in dedup.signatures
+    # With the original gone, the copy is stored for b
+    assert len(dedup.filter([node(BOILERPLATE, "/b.pdf")])) == 1
+
+
+def test_signatures_survive_a_restart(tmp_path):
+    path = str(tmp_path / "signatures.pkl")
+    dedup = ChunkDeduplicator(path)
+    dedup.filter([node(BOILERPLATE, "/a.pdf")])
+    dedup.close()
+
+    reloaded = ChunkDeduplicator(path)
+    assert reloaded.filter([node(BOILERPLATE, "/b.pdf")]) == []
+    assert reloaded.dependents_of(["/a.pdf"]) == {"/b.pdf"}
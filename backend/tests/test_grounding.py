@@ -0,0 +1,54 @@
+"""Outline grounding: concurrent searches merged across sections."""
+import time
+
+from seo.grounding import OutlineGrounder
+
+
+class StubRetriever:
+    def __init__(self, hits: dict, delays: dict = None):
+        self.hits = hits
+        self.delays = delays or {}
+
+    def search(self, query, top_k):
+        time.sleep(self.delays.get(query, 0))
+        if query == "boom":
+            raise RuntimeError("search failed")
+        return self.hits.get(query, [])[:top_k]
+
+
+def hit(node_id: str, score: float, rerank_score=None) -> dict:
+    return {
+        "node_id": node_id,
+        "text": f"text of {node_id}",
+        "score": score,
+        "rerank_score": rerank_score,
+        "metadata": {"file_name": f"{node_id}.pdf", "page": 1}
+    }
+
+
+def test_shared_chunk_goes_to_best_section():
+    retriever = StubRetriever({"a": [hit("n1", 0.9), hit("n2", 0.5)], "b": [hit("n1", 0.7), hit("n3", 0.6)]})
+    result = OutlineGrounder(budget_ms=1000).ground(retriever, ["a", "b"])
+
+    names = [[s["file_name"] for s in sources] for sources in result["sources"]]
+    assert names == [["n1.pdf", "n2.pdf"], ["n3.pdf"]]
+    assert result["stats"]["unique_chunks"] == 3
+
+
+def test_unscored_rerank_hits_rank_after_scored_ones():
+    retriever = StubRetriever({"a": [hit("n1", 0.9, None), hit("n2", 0.2, -3.0)]})
+    sources = OutlineGrounder(budget_ms=1000).ground(retriever, ["a"])["sources"][0]
+
+    assert [s["file_name"] for s in sources] == ["n2.pdf", "n1.pdf"]
+    assert sources[0]["rerank_score"] == -3.0
+    assert "rerank_score" not in sources[1]
+
+
+def test_slow_and_failed_searches_get_no_sources():
+    retriever = StubRetriever({"a": [hit("n1", 0.9)]}, delays={"slow": 0.5})
+    result = OutlineGrounder(budget_ms=100).ground(retriever, ["a", "slow", "boom"])
+
+    assert result["sources"][0][0]["file_name"] == "n1.pdf"
+    assert result["sources"][1] is None and result["sources"][2] is None
+    assert result["stats"]["timed_out"] == 1
+    assert result["stats"]["failed"] == 1
@@ -0,0 +1,54 @@
+"""Tool/stage metrics registry."""
+import pytest
+
+from metrics import Histogram, MetricsRegistry
+from rag.batching import MicroBatcher
+
+
+def test_histogram_percentiles_are_bucket_bounds():
+    histogram = Histogram()
+    for value in [0.5] * 90 + [40] * 10:
+        histogram.observe(value)
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == 1
+    assert summary["p99_ms"] == 50
+
+
+def test_tool_errors_are_counted():
+    registry = MetricsRegistry()
+    with registry.tool("search"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.tool("search"):
+            raise ValueError("bad input")
+
+    entry = registry.snapshot()["tools"]["search"]
+    assert entry["calls"] == 2
+    assert entry["errors"] == 1
+    assert entry["error_rate"] == 0.5
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    with registry.stage("embed"):
+        pass
+    assert registry.snapshot()["stages"] == {}
+
+
+def test_batchers_and_prometheus_text():
+    batcher = MicroBatcher(lambda items: items, window_ms=0)
+    batcher.submit(1)
+    batcher.close()
+
+    registry = MetricsRegistry()
+    registry.register_batcher("queries", batcher)
+    with registry.stage("db.search"):
+        pass
+
+    assert registry.snapshot()["batching"]["queries"]["requests"] == 1
+    text = registry.prometheus_text()
+    assert 'stage="db.search"' in text
+    assert 'mcp_batch_requests_total{batcher="queries"} 1' in text
+    registry.register_batcher("queries", None)
+    assert registry.snapshot()["batching"] == {}
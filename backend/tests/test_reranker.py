@@ -0,0 +1,66 @@
+"""Cross-encoder re-ranking within a latency budget (stub model, no download)."""
+import time
+
+from rag.reranker import CrossEncoderReranker
+
+
+class StubModel:
+    """Scores a pair by text length; sleeps `pair_ms` per pair."""
+
+    def __init__(self, pair_ms: float = 0.0):
+        self.pair_ms = pair_ms
+        self.batches = []
+
+    def predict(self, pairs, batch_size=None, show_progress_bar=False):
+        self.batches.append(len(pairs))
+        time.sleep(self.pair_ms * len(pairs) / 1000)
+        return [float(len(text)) for _, text in pairs]
+
+
+def make_reranker(model, pair_ms=None, **kwargs) -> CrossEncoderReranker:
+    reranker = CrossEncoderReranker(**kwargs)
+    reranker._model = model
+    reranker._pair_ms = pair_ms
+    return reranker
+
+
+def results(count: int) -> list:
+    return [{"text": "x" * (i + 1), "score": 1 - i / 100} for i in range(count)]
+
+
+def test_reorders_by_cross_encoder_score():
+    reranker = make_reranker(StubModel(), budget_ms=1000)
+    reranked = reranker.rerank("q", results(5), top_k=3)
+    assert [len(r["text"]) for r in reranked] == [5, 4, 3]
+    assert all(r["rerank_score"] is not None for r in reranked)
+
+
+def test_budget_limits_scored_pairs():
+    model = StubModel(pair_ms=5)
+    reranker = make_reranker(model, pair_ms=5, budget_ms=20, batch_size=16)
+    reranked = reranker.rerank("q", results(30), top_k=30)
+
+    scored = [r for r in reranked if r["rerank_score"] is not None]
+    assert 0 < len(scored) < 30
+    # Unscored hits keep their vector order behind the scored ones
+    assert reranked[len(scored):] == [r for r in reranked if r["rerank_score"] is None]
+    assert [r["score"] for r in reranked[len(scored):]] == sorted((r["score"] for r in reranked[len(scored):]), reverse=True)
+
+
+def test_scores_at_least_one_pair_when_estimate_exceeds_budget():
+    model = StubModel()
+    reranker = make_reranker(model, pair_ms=1000, budget_ms=10)
+    reranked = reranker.rerank("q", results(4), top_k=4)
+    assert model.batches == [1]
+    assert reranked[0]["rerank_score"] is not None
+    # The fast batch pulls the per-pair estimate down again
+    assert reranker._pair_ms < 1000
+
+
+def test_cached_scores_skip_the_model():
+    model = StubModel()
+    reranker = make_reranker(model, budget_ms=1000)
+    reranker.rerank("q", results(3), top_k=3)
+    calls = len(model.batches)
+    reranker.rerank("q", results(3), top_k=3)
+    assert len(model.batches) == calls
@@ -0,0 +1,72 @@
+"""Compact response encoding and byte budgets."""
+from responses import budget_bytes, compact_knowledge_results, compact_web_results, encode_compact, excerpt
+
+TEXT = "Roses need pruning in late winter. " * 30
+
+
+def knowledge_result(hits: int = 5) -> dict:
+    return {
+        "query": "how do I prune roses",
+        "citation_format": "[file, p. N]",
+        "results": [
+            {"source": f"garden{i % 2}.pdf, p. {i}", "relevance_score": 0.9 - i / 100, "text": TEXT}
+            for i in range(hits)
+        ]
+    }
+
+
+def web_result(hits: int = 3) -> dict:
+    return {
+        "query": "solar panel cost",
+        "citation_format": "[title](url)",
+        "results": [
+            {
+                "title": "A rather long page title about solar panels " * 4,
+                "url": f"https://example.com/{i}/" + "segment/" * 30,
+                "snippet": "Solar panel cost depends on the roof and the region. " * 10,
+                "source": "searxng"
+            }
+            for i in range(hits)
+        ]
+    }
+
+
+def test_budget_bytes_takes_the_tighter_limit():
+    assert budget_bytes() is None
+    assert budget_bytes(max_tokens=100) == 400
+    assert budget_bytes(max_tokens=100, max_bytes=300) == 300
+
+
+def test_excerpt_keeps_query_terms_within_limit():
+    text = "filler words " * 50 + "pruning roses in winter " + "more filler " * 50
+    cut = excerpt(text, ["pruning", "roses"], 80)
+    assert len(cut) <= 80
+    assert "pruning roses" in cut
+
+
+def test_knowledge_results_fit_byte_budget():
+    for budget in (400, 1000, 3000):
+        compact = compact_knowledge_results(knowledge_result(), max_bytes=budget)
+        assert len(encode_compact(compact).encode()) <= budget
+        assert compact["num_results"] >= 1
+
+
+def test_knowledge_results_drop_weakest_hits_first():
+    compact = compact_knowledge_results(knowledge_result(), max_bytes=600)
+    pages = {int(hit["page"]) for source in compact["sources"] for hit in source["hits"]}
+    assert 0 < len(pages) < 5
+    assert pages == set(range(len(pages)))
+
+
+def test_web_results_trim_titles_and_urls_under_tight_budget():
+    compact = compact_web_results(web_result(), max_bytes=450)
+    assert compact["num_results"] >= 1
+    assert len(encode_compact(compact).encode()) <= 450
+    hit = compact["sites"][0]["hits"][0]
+    assert hit["title"].endswith("…") and hit["url"].endswith("…")
+
+
+def test_web_results_keep_full_fields_when_they_fit():
+    result = web_result(1)
+    compact = compact_web_results(result, max_bytes=5000)
+    assert compact["sites"][0]["hits"][0]["url"] == result["results"][0]["url"]
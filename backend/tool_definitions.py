@@ -0,0 +1,265 @@
+"""MCP tool names, descriptions and input schemas.
+
+Kept free of heavy imports so a thin front-end (see daemon.py) can list
+tools without loading any models.
+"""
+
+# Shared by the search tools: compact, budgeted output
+RESPONSE_FORMAT_PROPERTIES = {
+    "response_format": {
+        "type": "string",
+        "enum": ["full", "compact"],
+        "description": "full: indented JSON with complete chunks; compact: results grouped by source, text trimmed around the match (default: full)"
+    },
+    "max_tokens": {
+        "type": "number",
+        "description": "Approximate token budget for the response (implies compact)"
+    },
+    "max_bytes": {
+        "type": "number",
+        "description": "Byte budget for the response (implies compact)"
+    }
+}
+
+GROUNDING_PROPERTIES = {
+    "grounded": {
+        "type": "boolean",
+        "description": "Attach supporting excerpts from the knowledge base to every section/question, retrieved concurrently within one latency budget (default: false)"
+    },
+    "sources_per_section": {
+        "type": "number",
+        "description": "Sources kept per section when grounded (default: 3)"
+    }
+}
+
+TOOLS = [
+    {
+        "name": "search_knowledge_base",
+        "description": "Search your personal knowledge base (documents, notes, PDFs). Returns relevant excerpts with citations.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query"
+                },
+                "top_k": {
+                    "type": "number",
+                    "description": "Number of results to return (default: 5)",
+                    "default": 5
+                },
+                "rerank": {
+                    "type": "boolean",
+                    "description": "Re-rank candidates with the local cross-encoder (default: on when enabled on the server)"
+                },
+                **RESPONSE_FORMAT_PROPERTIES
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "web_search",
+        "description": "Search the web for fresh, up-to-date information. Returns titles, URLs, and snippets.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query"
+                },
+                "num_results": {
+                    "type": "number",
+                    "description": "Number of results to return (default: 5)",
+                    "default": 5
+                },
+                **RESPONSE_FORMAT_PROPERTIES
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "upload_document",
+        "description": "Upload a new document (PDF, DOCX, TXT, MD) to the knowledge base and index it.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "file_path": {
+                    "type": "string",
+                    "description": "Full path to document file"
+                }
+            },
+            "required": ["file_path"]
+        }
+    },
+    {
+        "name": "generate_seo_outline",
+        "description": "Generate SEO-optimized content outline with heading structure, keyword placement, checklist, and semantic keywords related to the topic in your indexed documents. With grounded=true each H2 cites supporting sources.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "topic": {
+                    "type": "string",
+                    "description": "Main topic for the article"
+                },
+                "keywords": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Optional target keywords"
+                },
+                **GROUNDING_PROPERTIES
+            },
+            "required": ["topic"]
+        }
+    },
+    {
+        "name": "generate_aeo_snippets",
+        "description": "Generate Answer Engine Optimization snippets for AI assistants, voice search, and featured snippets, with semantic keywords from your indexed documents. With grounded=true each question cites supporting sources.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "topic": {
+                    "type": "string",
+                    "description": "Main topic"
+                },
+                "context": {
+                    "type": "string",
+                    "description": "Optional context from knowledge base"
+                },
+                **GROUNDING_PROPERTIES
+            },
+            "required": ["topic"]
+        }
+    },
+    {
+        "name": "extract_keywords",
+        "description": "Extract SEO keywords from text using KeyBERT.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "text": {
+                    "type": "string",
+                    "description": "Text to extract keywords from"
+                },
+                "top_n": {
+                    "type": "number",
+                    "description": "Number of keywords to extract (default: 10)",
+                    "default": 10
+                }
+            },
+            "required": ["text"]
+        }
+    },
+    {
+        "name": "analyze_content_seo",
+        "description": "Analyze content for SEO quality (keyword density, structure, sentence length and Flesch readability, entity/noun-phrase semantic keywords). Pass contents to analyze several drafts in one batch.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "content": {
+                    "type": "string",
+                    "description": "Content to analyze"
+                },
+                "contents": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Several drafts to analyze in one batch (instead of content); returns one analysis per draft"
+                },
+                "target_keyword": {
+                    "type": "string",
+                    "description": "Primary keyword to check"
+                }
+            },
+            "required": ["target_keyword"]
+        }
+    },
+    {
+        "name": "reindex_documents",
+        "description": "Rebuild the knowledge base index from all documents in the documents directory. Unchanged files are skipped unless force is set.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "force": {
+                    "type": "boolean",
+                    "description": "Re-embed every document even if unchanged (default: false)",
+                    "default": False
+                }
+            },
+            "required": []
+        }
+    },
+    {
+        "name": "switch_embedding_model",
+        "description": "Build an index for a different local embedding model in the background and switch search to it when done. Search keeps using the current model meanwhile.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "model_name": {
+                    "type": "string",
+                    "description": "HuggingFace embedding model (e.g. BAAI/bge-base-en-v1.5)"
+                },
+                "activate": {
+                    "type": "boolean",
+                    "description": "Switch search to the new model once built (default: true)",
+                    "default": True
+                }
+            },
+            "required": ["model_name"]
+        }
+    },
+    {
+        "name": "list_embedding_models",
+        "description": "List embedding models with an index, which one is active, and shadow build progress.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    },
+    {
+        "name": "list_indexed_documents",
+        "description": "List documents currently in the knowledge base with chunk count, size, content hash and index time. Paginated.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "number",
+                    "description": "Page size (default: 50, max: 500)",
+                    "default": 50
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from the previous page"
+                },
+                "file_type": {
+                    "type": "string",
+                    "description": "Only this file type (pdf, docx, txt, md)"
+                },
+                "name_contains": {
+                    "type": "string",
+                    "description": "Case-insensitive file name filter"
+                },
+                "indexed_after": {
+                    "type": "string",
+                    "description": "Only documents indexed after this ISO 8601 timestamp (UTC if it has no offset)"
+                }
+            },
+            "required": []
+        }
+    },
+    {
+        "name": "get_server_metrics",
+        "description": "Server health: per-tool call counts, error rates and latency percentiles, plus timings for internal stages (query embedding, DB search, web providers, KeyBERT) and micro-batching stats (batch sizes, queue wait).",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "format": {
+                    "type": "string",
+                    "enum": ["json", "prometheus"],
+                    "description": "json summary or Prometheus text exposition (default: json)",
+                    "default": "json"
+                }
+            },
+            "required": []
+        }
+    }
+]
@@ -1,8 +1,11 @@
 """Web search integration - Brave, SearxNG, and optional premium APIs."""
 import os
+import sys
 import aiohttp
 from typing import List, Dict, Optional
 
+from metrics import stage
+
 
 class WebSearcher:
     """Search the web for fresh information."""
@@ -63,28 +66,29 @@ class WebSearcher:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, params=params, timeout=10) as resp:
-                    if resp.status != 200:
-                        return []
-
-                    data = await resp.json()
-                    results = data.get("web", {}).get("results", [])
-
-                    # Format results
-                    formatted = []
-                    for result in results[:num_results]:
-                        formatted.append({
-                            "title": result.get("title", ""),
-                            "url": result.get("url", ""),
-                            "snippet": result.get("description", ""),
-                            "source": "Brave"
-                        })
-
-                    return formatted
+            with stage("web.brave"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(url, headers=headers, params=params, timeout=10) as resp:
+                        if resp.status != 200:
+                            return []
+
+                        data = await resp.json()
+                        results = data.get("web", {}).get("results", [])
+
+                        # Format results
+                        formatted = []
+                        for result in results[:num_results]:
+                            formatted.append({
+                                "title": result.get("title", ""),
+                                "url": result.get("url", ""),
+                                "snippet": result.get("description", ""),
+                                "source": "Brave"
+                            })
+
+                        return formatted
 
         except Exception as e:
-            print(f"Brave search error: {e}")
+            print(f"Brave search error: {e}", file=sys.stderr)
             return []
 
     async def _search_serper(self, query: str, num_results: int) -> List[Dict]:
@@ -100,28 +104,29 @@ class WebSearcher:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers, timeout=10) as resp:
-                    if resp.status != 200:
-                        return []
-
-                    data = await resp.json()
-                    results = data.get("organic", [])
-
-                    # Format results
-                    formatted = []
-                    for result in results[:num_results]:
-                        formatted.append({
-                            "title": result.get("title", ""),
-                            "url": result.get("link", ""),
-                            "snippet": result.get("snippet", ""),
-                            "source": "Serper"
-                        })
-
-                    return formatted
+            with stage("web.serper"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(url, json=payload, headers=headers, timeout=10) as resp:
+                        if resp.status != 200:
+                            return []
+
+                        data = await resp.json()
+                        results = data.get("organic", [])
+
+                        # Format results
+                        formatted = []
+                        for result in results[:num_results]:
+                            formatted.append({
+                                "title": result.get("title", ""),
+                                "url": result.get("link", ""),
+                                "snippet": result.get("snippet", ""),
+                                "source": "Serper"
+                            })
+
+                        return formatted
 
         except Exception as e:
-            print(f"Serper search error: {e}")
+            print(f"Serper search error: {e}", file=sys.stderr)
             return []
 
     async def _search_searxng(self, query: str, num_results: int) -> List[Dict]:
@@ -134,28 +139,29 @@ class WebSearcher:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=10) as resp:
-                    if resp.status != 200:
-                        return []
-
-                    data = await resp.json()
-                    results = data.get("results", [])
-
-                    # Format results
-                    formatted = []
-                    for result in results[:num_results]:
-                        formatted.append({
-                            "title": result.get("title", ""),
-                            "url": result.get("url", ""),
-                            "snippet": result.get("content", ""),
-                            "source": "SearxNG"
-                        })
-
-                    return formatted
+            with stage("web.searxng"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(url, params=params, timeout=10) as resp:
+                        if resp.status != 200:
+                            return []
+
+                        data = await resp.json()
+                        results = data.get("results", [])
+
+                        # Format results
+                        formatted = []
+                        for result in results[:num_results]:
+                            formatted.append({
+                                "title": result.get("title", ""),
+                                "url": result.get("url", ""),
+                                "snippet": result.get("content", ""),
+                                "source": "SearxNG"
+                            })
+
+                        return formatted
 
         except Exception as e:
-            print(f"SearxNG search error: {e}")
+            print(f"SearxNG search error: {e}", file=sys.stderr)
             return []
 
     async def _search_tavily(self, query: str, num_results: int) -> List[Dict]:
@@ -171,29 +177,30 @@ class WebSearcher:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers, timeout=10) as resp:
-                    if resp.status != 200:
-                        # Fall back to SearxNG
-                        return await self._search_searxng(query, num_results)
-
-                    data = await resp.json()
-                    results = data.get("results", [])
-
-                    # Format results
-                    formatted = []
-                    for result in results:
-                        formatted.append({
-                            "title": result.get("title", ""),
-                            "url": result.get("url", ""),
-                            "snippet": result.get("content", ""),
-                            "source": "Tavily"
-                        })
-
-                    return formatted
+            with stage("web.tavily"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(url, json=payload, headers=headers, timeout=10) as resp:
+                        if resp.status != 200:
+                            # Fall back to SearxNG
+                            return await self._search_searxng(query, num_results)
+
+                        data = await resp.json()
+                        results = data.get("results", [])
+
+                        # Format results
+                        formatted = []
+                        for result in results:
+                            formatted.append({
+                                "title": result.get("title", ""),
+                                "url": result.get("url", ""),
+                                "snippet": result.get("content", ""),
+                                "source": "Tavily"
+                            })
+
+                        return formatted
 
         except Exception as e:
-            print(f"Tavily search error: {e}")
+            print(f"Tavily search error: {e}", file=sys.stderr)
             # Fall back to SearxNG
             return await self._search_searxng(query, num_results)
 